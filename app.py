@@ -7,18 +7,32 @@ A simple AI agent that manages AEP events using Flask instead of Gradio.
 from __future__ import annotations
 
 import asyncio
-import json
+import math
+import operator
 import os
-import re
 import subprocess
+import itertools
+import queue
+import re
+import shutil
 import threading
-from datetime import datetime, timezone
+import uuid
+from array import array
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
 from pathlib import Path
 
-from flask import Flask, render_template, request, jsonify
+import orjson
+from flask import Flask, abort, request
 from flask_cors import CORS
 from dotenv import load_dotenv
-from openai import OpenAI
+from openai import AsyncOpenAI
+
+try:
+    import uvloop          # optional, faster event loop (not available on Windows)
+except ImportError:
+    uvloop = None
 
 # ─── env ─────────────────────────────────────────────────────────────────────
 load_dotenv()
@@ -28,7 +42,7 @@ GMAIL_USER = os.environ.get("GMAIL_USER", "").strip()
 if not OPENAI_API_KEY:
     print("⚠️  OPENAI_API_KEY not set.  Add it to your .env file.")
 
-client = OpenAI(api_key=OPENAI_API_KEY)
+client = AsyncOpenAI(api_key=OPENAI_API_KEY)
 
 # ─── paths ───────────────────────────────────────────────────────────────────
 BASE_DIR    = Path(__file__).resolve().parent
@@ -42,7 +56,110 @@ import gmail_mail  # Gmail SMTP integration
 # SHARED STATE
 # ══════════════════════════════════════════════════════════════════════════════
 
-event_log: list[dict] = []
+LOG_MAX = int(os.environ.get("LOG_MAX", "1000"))
+if LOG_MAX < 1:
+    raise ValueError(f"LOG_MAX must be at least 1 (got {LOG_MAX})")
+
+class LogRing:
+    """
+    Bounded event log, stored column-wise in preallocated lists.
+
+    Every entry gets a monotonically increasing id; once more than `cap`
+    entries have been appended the oldest ones are overwritten.  Times are
+    stored as raw epoch floats and only formatted when entries are read.
+
+    The engine thread hands entries over with post(), a lock-free put on a
+    SimpleQueue.  Readers and request-thread writers drain that queue into
+    the ring under a single lock, so a read always sees a consistent snapshot.
+    """
+    __slots__ = ("ts", "event", "action", "status", "detail", "to", "subject",
+                 "_next", "cap", "_inbox", "_lock")
+    _FIELDS   = ("event", "action", "status", "detail", "to", "subject")
+
+    def __init__(self, cap: int = LOG_MAX):
+        if cap < 1:
+            raise ValueError(f"LogRing capacity must be at least 1 (got {cap})")
+        self.cap    = cap
+        self._next  = 0                   # entries ever appended = id of the next one
+        self._inbox: queue.SimpleQueue[tuple] = queue.SimpleQueue()
+        self._lock  = threading.Lock()
+        self.ts     = array("d", bytes(8 * cap))
+        for name in self._FIELDS:
+            setattr(self, name, [""] * cap)
+
+    @property
+    def idx(self) -> int:
+        """Id the next entry will get (= number of entries ever appended)."""
+        with self._lock:
+            self._drain()
+            return self._next
+
+    def __len__(self) -> int:
+        return min(self.idx, self.cap)
+
+    def post(self, event: str, action: str, status: str,
+             detail: str = "", to: str = "", subject: str = "") -> None:
+        """Queue an entry from the engine thread; it lands on the next read."""
+        self._inbox.put((time.time(), event, action, status, detail, to, subject))
+
+    def append(self, event: str, action: str, status: str,
+               detail: str = "", to: str = "", subject: str = "") -> int:
+        """Add an entry now and return its id."""
+        entry = (time.time(), event, action, status, detail, to, subject)
+        with self._lock:
+            self._drain()
+            return self._store(entry)
+
+    def _store(self, entry: tuple) -> int:
+        i = self._next % self.cap
+        (self.ts[i], self.event[i], self.action[i], self.status[i],
+         self.detail[i], self.to[i], self.subject[i]) = entry
+        self._next += 1
+        return self._next - 1
+
+    def _drain(self) -> None:
+        """Move posted entries into the ring (caller holds the lock)."""
+        while True:
+            try:
+                entry = self._inbox.get_nowait()
+            except queue.Empty:
+                return
+            self._store(entry)
+
+    def _row(self, n: int) -> dict:
+        i = n % self.cap
+        return {
+            "id":      n,
+            "time":    time.strftime("%H:%M:%S UTC", time.gmtime(self.ts[i])),
+            "event":   self.event[i],
+            "action":  self.action[i],
+            "status":  self.status[i],
+            "detail":  self.detail[i],
+            "to":      self.to[i],
+            "subject": self.subject[i],
+        }
+
+    def since(self, after: int = -1) -> list[dict]:
+        """Retained entries with id > after, oldest first.  A cursor at or past
+        the next id (e.g. from before a restart) is stale → everything retained."""
+        with self._lock:
+            self._drain()
+            if after >= self._next:
+                after = -1
+            first = max(after + 1, self._next - self.cap, 0)
+            return [self._row(n) for n in range(first, self._next)]
+
+    def tail(self, n: int) -> list[dict]:
+        """The last n retained entries, oldest first."""
+        with self._lock:
+            self._drain()
+            first = max(self._next - n, self._next - self.cap, 0)
+            return [self._row(k) for k in range(first, self._next)]
+
+
+event_log = LogRing()
+_msg_seq  = itertools.count(1)     # ids for mock / error message results
+
 engine: ee.AEPEventEngine | None = None
 engine_loop: asyncio.AbstractEventLoop | None = None
 
@@ -55,15 +172,14 @@ async def _real_mail_send(to: list[str], subject: str, body: str, event_name: st
     """Calls Gmail SMTP via gmail_mail module."""
     result = await gmail_mail.send_mail(to=to, subject=subject, body=body)
     status_label = "✅ sent" if result["status"] == "sent" else f"❌ {result.get('error','?')}"
-    event_log.append({
-        "time":    datetime.now(tz=timezone.utc).strftime("%H:%M:%S UTC"),
-        "event":   event_name,
-        "action":  "mail_send (Gmail)",
-        "status":  status_label,
-        "detail":  f"→ {len(to)} recipient(s)  |  {result.get('message_id', 'n/a')}",
-        "to":      ", ".join(to),
-        "subject": subject,
-    })
+    event_log.post(
+        event   = event_name,
+        action  = "mail_send (Gmail)",
+        status  = status_label,
+        detail  = f"→ {len(to)} recipient(s)  |  {result.get('message_id', 'n/a')}",
+        to      = ", ".join(to),
+        subject = subject,
+    )
     return result
 
 
@@ -71,16 +187,15 @@ async def _real_mail_send(to: list[str], subject: str, body: str, event_name: st
 async def _mock_mail_send(to: list[str], subject: str, body: str, event_name: str = "unknown-event") -> dict:
     """Simulates email sending for demo purposes."""
     await asyncio.sleep(0.3)
-    msg_id = f"mock-{len(event_log) + 1:04d}"
-    event_log.append({
-        "time":    datetime.now(tz=timezone.utc).strftime("%H:%M:%S UTC"),
-        "event":   event_name,
-        "action":  "mail_send (MOCK)",
-        "status":  "✅ sent (mock)",
-        "detail":  f"→ {len(to)} recipient(s)  |  {msg_id}",
-        "to":      ", ".join(to),
-        "subject": subject,
-    })
+    msg_id = f"mock-{next(_msg_seq):04d}"
+    event_log.post(
+        event   = event_name,
+        action  = "mail_send (MOCK)",
+        status  = "✅ sent (mock)",
+        detail  = f"→ {len(to)} recipient(s)  |  {msg_id}",
+        to      = ", ".join(to),
+        subject = subject,
+    )
     return {"status": "sent", "message_id": msg_id}
 
 
@@ -109,17 +224,16 @@ async def mock_mail_send(params: dict) -> dict:
         to = raw_to
 
     if not to:
-        msg_id = f"error-{len(event_log) + 1:04d}"
+        msg_id = f"error-{next(_msg_seq):04d}"
         status = "❌ error: No recipients"
-        event_log.append({
-            "time":    datetime.now(tz=timezone.utc).strftime("%H:%M:%S UTC"),
-            "event":   event_name,
-            "action":  "mail_send",
-            "status":  status,
-            "detail":  "No valid recipients found",
-            "to":      "",
-            "subject": subject,
-        })
+        event_log.post(
+            event   = event_name,
+            action  = "mail_send",
+            status  = status,
+            detail  = "No valid recipients found",
+            to      = "",
+            subject = subject,
+        )
         return {"status": "error", "message_id": msg_id}
 
     # Route to real or mock
@@ -146,7 +260,7 @@ def _boot_engine():
     def _run():
         global engine_loop
         try:
-            engine_loop = asyncio.new_event_loop()
+            engine_loop = uvloop.new_event_loop() if uvloop else asyncio.new_event_loop()
             asyncio.set_event_loop(engine_loop)
             engine_loop.run_until_complete(engine.run())
         except Exception as e:
@@ -164,46 +278,68 @@ _boot_engine()
 # CLAUDE AGENT
 # ══════════════════════════════════════════════════════════════════════════════
 
+_snapshot_cache: tuple[int, str] | None = None          # (engine.version, text)
+_recent_log_cache: tuple[int, int, str] | None = None   # (event_log.idx, n, text)
+
+def _bump_version() -> None:
+    """Mark event state as changed (invalidates cached snapshots)."""
+    if engine:
+        engine.bump_version()
+
 def _event_state_snapshot() -> str:
     """Build a text block describing current events."""
+    global _snapshot_cache
     if not engine:
         return "No events loaded."
-    lines = []
-    for ev in engine.events:
-        status_icon = "🟢 ACTIVE" if ev.active else "🔴 INACTIVE"
-        last   = engine._last_fired.get(ev.name)
-        if last:
-            status = f"{status_icon}, last fired {last.strftime('%H:%M:%S UTC')}"
-        else:
-            status = f"{status_icon}, never fired"
-        lines.append(
-            f"  • {ev.name}\n"
-            f"      description: {ev.description.strip()}\n"
-            f"      type:        {ev.event_type}\n"
-            f"      schedule:    {ev.schedule_raw}\n"
-            f"      action:      {ev.action.get('mcp') or ev.action.get('script')}\n"
-            f"      status:      {status}"
-        )
-    return "\n".join(lines) if lines else "No events loaded."
+    # read once, before building: a bump landing mid-build must not get
+    # the older text cached under its version
+    version = engine.version
+    if _snapshot_cache and _snapshot_cache[0] == version:
+        return _snapshot_cache[1]
+    # deterministic order keeps the block byte-stable between turns
+    text = "\n".join([
+        _event_block(ev) for ev in sorted(engine.events, key=lambda ev: ev.name)
+    ]) or "No events loaded."
+    _snapshot_cache = (version, text)
+    return text
+
+def _event_block(ev: ee.EventDef) -> str:
+    """One event's entry in the snapshot."""
+    status_icon = "🟢 ACTIVE" if ev.active else "🔴 INACTIVE"
+    last = engine._last_fired.get(ev.name)
+    if last:
+        status = f"{status_icon}, last fired {last}"
+    else:
+        status = f"{status_icon}, never fired"
+    return (
+        f"  • {ev.name}\n"
+        f"      description: {ev.description.strip()}\n"
+        f"      type:        {ev.event_type}\n"
+        f"      schedule:    {ev.schedule_raw}\n"
+        f"      action:      {ev.action_label}\n"
+        f"      status:      {status}"
+    )
 
 def _recent_log(n: int = 5) -> str:
-    """Last N log entries as text for the prompt."""
+    """Last N log entries as text for the prompt (re-rendered only after an append)."""
+    global _recent_log_cache
     if not event_log:
         return "  (no events have fired yet)"
-    lines = []
-    for entry in event_log[-n:]:
-        lines.append(f"  [{entry['time']}] {entry['event']} → {entry['status']}  {entry['detail']}")
-    return "\n".join(lines)
-
-SYSTEM_PROMPT_TEMPLATE = """\
+    idx = event_log.idx
+    if _recent_log_cache and _recent_log_cache[:2] == (idx, n):
+        return _recent_log_cache[2]
+    text = "\n".join([
+        f"  [{e['time']}] {e['event']} → {e['status']}  {e['detail']}"
+        for e in event_log.tail(n)
+    ])
+    _recent_log_cache = (idx, n, text)
+    return text
+
+# Static skill/rules block — kept byte-identical across turns so the provider's
+# prefix cache can reuse it.  Per-turn state is fetched through AGENT_TOOLS.
+STATIC_SKILL_PROMPT = """\
 You are the AEP Event Agent — a smart assistant with an "event-creator" skill for managing event-driven workflows.
 
-══ CURRENT EVENTS ══
-{event_state}
-
-══ RECENT EVENT LOG ══
-{recent_log}
-
 ══ SKILL: EVENT-CREATOR ══
 
 Guide for creating effective events. Use this skill when users want to create a new scheduled event.
@@ -237,12 +373,14 @@ Guide for creating effective events. Use this skill when users want to create a
 "I'll create an event that sends email every 2 minutes to receiver@mail.com."
 
 <aep_action>
-{{"action": "create", "name": "test-email", "description": "Send test email every 2 minutes", "schedule": "every 2 minutes", "recipients": "receiver@mail.com", "subject": "Test", "body": "Hello, this is AEP!"}}
+{"action": "create", "name": "test-email", "description": "Send test email every 2 minutes", "schedule": "every 2 minutes", "recipients": "receiver@mail.com", "subject": "Test", "body": "Hello, this is AEP!"}
 </aep_action>
 
 ══ WHAT YOU CAN DO ══
 
 1. **Answer questions** about events, schedules, and the event log.
+   Call the `list_events` tool to see the loaded events and their status, and
+   the `recent_log` tool to see what has fired.  Look event names up — never guess.
 
 2. **Activate an event** to start firing it on schedule:
    
@@ -254,7 +392,7 @@ Guide for creating effective events. Use this skill when users want to create a
    Match the user's request to the most relevant INACTIVE event and activate it:
 
      <aep_action>
-     {{"action": "activate", "name": "<exact-event-name>"}}
+     {"action": "activate", "name": "<exact-event-name>"}
      </aep_action>
 
    Note: Events are INACTIVE by default. They only start firing when activated.
@@ -262,7 +400,7 @@ Guide for creating effective events. Use this skill when users want to create a
 3. **Fire an event once** immediately (without activating it):
 
      <aep_action>
-     {{"action": "fire", "name": "<exact-event-name>"}}
+     {"action": "fire", "name": "<exact-event-name>"}
      </aep_action>
 
 4. **Deactivate an event** to stop it from firing:
@@ -270,23 +408,23 @@ Guide for creating effective events. Use this skill when users want to create a
    When user says "stop sending mail to desi", "deactivate event":
 
      <aep_action>
-     {{"action": "deactivate", "name": "<exact-event-name>"}}
+     {"action": "deactivate", "name": "<exact-event-name>"}
      </aep_action>
 
 5. **Create a new event** using the event-creator skill above.
    explanation AND include:
 
      <aep_action>
-     {{"action": "create", "name": "<kebab-case-name>", "description": "<one line>", "schedule": "<natural language>", "mcp_tool": "<tool name>"}}
+     {"action": "create", "name": "<kebab-case-name>", "description": "<one line>", "schedule": "<natural language>", "mcp_tool": "<tool name>"}
      </aep_action>
 
 6. **Delete an event** permanently when user says "delete event", "remove event":
 
      <aep_action>
-     {{"action": "delete", "name": "<exact-event-name>"}}
+     {"action": "delete", "name": "<exact-event-name>"}
      </aep_action>
 
-7. List events — just describe what's loaded.  No special tag needed.
+7. List events — call `list_events` and describe what's loaded.  No special tag needed.
 
 ══ RULES ══
 • Keep responses concise and friendly.
@@ -302,40 +440,260 @@ Guide for creating effective events. Use this skill when users want to create a
 • The mail MCP tool is called "mail_send".
 """
 
-def build_system_prompt() -> str:
-    return SYSTEM_PROMPT_TEMPLATE.format(
-        event_state = _event_state_snapshot(),
-        recent_log  = _recent_log(),
-    )
+PROMPT_CACHE_KEY = "aep-agent-v1"
+
+# Event state is fetched on demand through these tools instead of being
+# injected into every prompt.
+AGENT_TOOLS = [
+    {
+        "type": "function",
+        "function": {
+            "name": "list_events",
+            "description": "List all loaded events with description, type, schedule, action and ACTIVE/INACTIVE status.",
+            "parameters": {"type": "object", "properties": {}},
+        },
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "recent_log",
+            "description": "Return the most recent event log entries (fires, creations, activations).",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "n": {"type": "integer", "description": "Number of entries to return (default 5)."},
+                },
+            },
+        },
+    },
+]
+MAX_TOOL_ROUNDS = 3
+
+def _run_agent_tool(name: str, arguments: str) -> str:
+    """Execute one tool call from the model and return its text result."""
+    try:
+        args = orjson.loads(arguments or "{}")
+    except orjson.JSONDecodeError:
+        args = {}
+    if name == "list_events":
+        return _event_state_snapshot()
+    if name == "recent_log":
+        n = args.get("n")
+        return _recent_log(n if isinstance(n, int) and n > 0 else 5)
+    return f"Unknown tool: {name}"
+
+async def _complete(messages: list[dict]) -> str:
+    """Run the chat model, answering its tool calls until it replies in text."""
+    for round_no in range(MAX_TOOL_ROUNDS + 1):
+        response = await client.chat.completions.create(
+            model="gpt-4o",
+            max_tokens=1024,
+            messages=messages,
+            tools=AGENT_TOOLS,
+            # out of rounds: force a text answer
+            tool_choice="none" if round_no == MAX_TOOL_ROUNDS else "auto",
+            extra_body={"prompt_cache_key": PROMPT_CACHE_KEY},
+        )
+        message = response.choices[0].message
+        if not message.tool_calls:
+            return message.content or ""
+        messages.append({
+            "role":       "assistant",
+            "content":    message.content,
+            "tool_calls": [tc.model_dump() for tc in message.tool_calls],
+        })
+        for tc in message.tool_calls:
+            messages.append({
+                "role":         "tool",
+                "tool_call_id": tc.id,
+                "content":      _run_agent_tool(tc.function.name, tc.function.arguments),
+            })
+    return ""
+
+# ══════════════════════════════════════════════════════════════════════════════
+# RESPONSE CACHE
+# ══════════════════════════════════════════════════════════════════════════════
+
+RESPONSE_CACHE_SIZE    = 1000
+RESPONSE_CACHE_MIN_SIM = 0.92
+EMBEDDING_MODEL        = "text-embedding-3-small"
+
+class ResponseCache:
+    """
+    Two-tier LRU cache of chat replies.
+
+    Tier 1 is an exact match on the normalised message text; tier 2 compares
+    unit-length embeddings (cosine >= RESPONSE_CACHE_MIN_SIM).  Every entry is
+    tied to a scope — event state version, log position and prior
+    conversation — and only matches within that scope.
+    """
+
+    def __init__(self, capacity: int = RESPONSE_CACHE_SIZE):
+        self._capacity = capacity
+        # (scope, normalised text) → (embedding | None, reply)
+        self._entries: OrderedDict[tuple, tuple[list[float] | None, str]] = OrderedDict()
+        # scope → {key: embedding | None}, so lookups only touch their own scope
+        self._scopes: dict[tuple, dict[tuple, list[float] | None]] = {}
+
+    @staticmethod
+    def _normalise(text: str) -> str:
+        return " ".join(text.lower().split())
+
+    def get_exact(self, scope: tuple, text: str) -> str | None:
+        key = (scope, self._normalise(text))
+        hit = self._entries.get(key)
+        if hit is None:
+            return None
+        self._entries.move_to_end(key)
+        return hit[1]
+
+    def has_scope(self, scope: tuple) -> bool:
+        return scope in self._scopes
+
+    @staticmethod
+    def _best_match(candidates: list[tuple[tuple, list[float]]], vec: list[float]) -> tuple | None:
+        best_key, best_sim = None, RESPONSE_CACHE_MIN_SIM
+        for key, emb in candidates:
+            sim = sum(map(operator.mul, emb, vec))
+            if sim >= best_sim:
+                best_key, best_sim = key, sim
+        return best_key
+
+    async def get_similar(self, scope: tuple, vec: list[float]) -> str | None:
+        candidates = [(key, emb) for key, emb in self._scopes.get(scope, {}).items()
+                      if emb is not None]
+        if not candidates:
+            return None
+        # the dot products are pure Python — keep them off the engine loop
+        best_key = await asyncio.to_thread(self._best_match, candidates, vec)
+        if best_key is None or best_key not in self._entries:   # evicted meanwhile
+            return None
+        self._entries.move_to_end(best_key)
+        return self._entries[best_key][1]
+
+    def put(self, scope: tuple, text: str, vec: list[float] | None, reply: str) -> None:
+        key = (scope, self._normalise(text))
+        self._entries[key] = (vec, reply)
+        self._entries.move_to_end(key)
+        self._scopes.setdefault(scope, {})[key] = vec
+        while len(self._entries) > self._capacity:
+            old, _ = self._entries.popitem(last=False)
+            bucket = self._scopes[old[0]]
+            del bucket[old]
+            if not bucket:
+                del self._scopes[old[0]]
+
+response_cache = ResponseCache()
+
+async def _embed(text: str) -> list[float] | None:
+    """Unit-length embedding of text, or None if the call fails."""
+    try:
+        result = await client.embeddings.create(model=EMBEDDING_MODEL, input=text)
+    except Exception:
+        return None
+    vec  = result.data[0].embedding
+    norm = math.sqrt(sum(x * x for x in vec)) or 1.0
+    return [x / norm for x in vec]
+
+async def _cached_complete(scope: tuple, user_msg: str, messages: list[dict]) -> str:
+    """_complete() behind the response cache (runs on the engine loop)."""
+    reply = response_cache.get_exact(scope, user_msg)
+    if reply is not None:
+        return reply
+    if response_cache.has_scope(scope):
+        vec = await _embed(user_msg)
+        if vec is not None:
+            reply = await response_cache.get_similar(scope, vec)
+            if reply is not None:
+                return reply
+        reply = await _complete(messages)
+    else:
+        # nothing to compare against: embed alongside the completion (for
+        # later lookups) instead of ahead of it
+        reply, vec = await asyncio.gather(_complete(messages), _embed(user_msg))
+    # never replay side-effecting replies
+    if "<aep_action>" not in reply:
+        response_cache.put(scope, user_msg, vec, reply)
+    return reply
+
+_AEP_OPEN  = "<aep_action>"
+_AEP_CLOSE = "</aep_action>"
 
 def parse_aep_action(text: str) -> dict | None:
     """Extract <aep_action>...</aep_action> JSON from Claude's response."""
-    m = re.search(r"<aep_action>\s*(.*?)\s*</aep_action>", text, re.DOTALL)
-    if not m:
+    i = text.find(_AEP_OPEN)
+    if i < 0:
+        return None
+    start = i + len(_AEP_OPEN)
+    j = text.find(_AEP_CLOSE, start)
+    if j < 0:
         return None
     try:
-        return json.loads(m.group(1))
-    except json.JSONDecodeError:
+        return orjson.loads(text[start:j].strip())
+    except orjson.JSONDecodeError:
         return None
 
 async def _fire_event_async(event_name: str) -> str:
     """Fire a single event right now."""
     if not engine:
         return "❌ Engine not running."
-    for ev in engine.events:
-        if ev.name == event_name:
-            await engine._dispatch(ev)
-            engine._last_fired[ev.name] = datetime.now(tz=timezone.utc)
-            return f"✅ Fired **{event_name}** manually."
-    return f"❌ Event '{event_name}' not found."
-
-def fire_event_now(event_name: str) -> str:
+    ev = engine._events_by_name.get(event_name)
+    if ev is None:
+        return f"❌ Event '{event_name}' not found."
+    await engine._dispatch(ev)
+    engine.mark_fired(ev)
+    return f"✅ Fired **{event_name}** manually."
+
+async def _on_engine_loop(coro):
+    """Await a coroutine on the engine's loop from a request's own loop."""
+    if not (engine_loop and engine_loop.is_running()):
+        return await coro
+    future = asyncio.run_coroutine_threadsafe(coro, engine_loop)
+    return await asyncio.wrap_future(future)
+
+async def fire_event_now(event_name: str) -> str:
     """Thread-safe bridge: schedule the async fire on the engine's loop."""
     if engine_loop and engine_loop.is_running():
-        future = asyncio.run_coroutine_threadsafe(_fire_event_async(event_name), engine_loop)
-        return future.result(timeout=10)
+        # shield: a timeout stops the wait, not the fire itself
+        return await asyncio.wait_for(
+            asyncio.shield(_on_engine_loop(_fire_event_async(event_name))), timeout=10
+        )
     return "❌ Engine loop not running."
 
+_RECIPIENT_SPLIT = re.compile(r"[,;\n]")
+
+# Manual fires started from /api/fire, by task id.  Finished ones are kept for
+# FIRE_RESULT_TTL seconds so a client can poll (or re-poll) the result.
+_pending_fires: dict[str, Future] = {}
+_fire_done_at:  dict[str, float]  = {}     # task id → time.monotonic() when it finished
+_fires_lock = threading.Lock()
+MAX_PENDING_FIRES = 256
+FIRE_RESULT_TTL   = 60
+
+def submit_fire(event_name: str) -> str | None:
+    """
+    Schedule a fire on the engine's loop without waiting; returns a task id
+    (None if the loop isn't running).  Raises RuntimeError when
+    MAX_PENDING_FIRES fires are still running or awaiting pickup.
+    """
+    if not (engine_loop and engine_loop.is_running()):
+        return None
+    with _fires_lock:
+        if len(_pending_fires) >= MAX_PENDING_FIRES:
+            # drop finished fires whose result has been kept long enough
+            cutoff = time.monotonic() - FIRE_RESULT_TTL
+            for tid, done_at in list(_fire_done_at.items()):
+                if done_at < cutoff:
+                    _pending_fires.pop(tid, None)
+                    _fire_done_at.pop(tid, None)
+            if len(_pending_fires) >= MAX_PENDING_FIRES:
+                raise RuntimeError("Too many manual fires in progress")
+        task_id = uuid.uuid4().hex
+        future  = asyncio.run_coroutine_threadsafe(_fire_event_async(event_name), engine_loop)
+        _pending_fires[task_id] = future
+    future.add_done_callback(lambda _: _fire_done_at.__setitem__(task_id, time.monotonic()))
+    return task_id
+
 def create_event_on_disk(cmd: dict) -> str:
     """Create a new event folder from the <aep_action> create command."""
     name        = cmd.get("name", "").strip().lower().replace(" ", "-")
@@ -360,23 +718,23 @@ def create_event_on_disk(cmd: dict) -> str:
     if event_dir.exists():
         return f"⚠️  Event '{name}' already exists."
 
-    event_dir.mkdir(parents=True)
-    (event_dir / "scripts").mkdir()
-    (event_dir / "references").mkdir()
+    refs_dir = event_dir / "references"
+    os.makedirs(event_dir / "scripts")
+    os.makedirs(refs_dir)
 
     # Create team-members.md with recipients
     team_members_content = "# Team members — one email per line\n# Lines starting with # are ignored\n\n"
     if recipients:
-        # Split by comma, newline, or semicolon
-        recipient_list = [r.strip() for r in recipients.replace(',', '\n').replace(';', '\n').split('\n') if r.strip()]
+        # Split by comma, newline, or semicolon in one pass
+        recipient_list = [s for r in _RECIPIENT_SPLIT.split(recipients) if (s := r.strip())]
         team_members_content += "\n".join(recipient_list) + "\n"
     else:
         team_members_content += "recipient@example.com\n"
     
-    (event_dir / "references" / "team-members.md").write_text(team_members_content, encoding="utf-8")
+    (refs_dir / "team-members.md").write_bytes(team_members_content.encode("utf-8"))
     
     # Create mail-template.md with body
-    (event_dir / "references" / "mail-template.md").write_text(body, encoding="utf-8")
+    (refs_dir / "mail-template.md").write_bytes(body.encode("utf-8"))
 
     # Create EVENT.md
     event_md = (
@@ -399,27 +757,32 @@ def create_event_on_disk(cmd: dict) -> str:
         f"Sends to recipients in `references/team-members.md`\n"
         f"Uses template from `references/mail-template.md`\n"
     )
-    (event_dir / "EVENT.md").write_text(event_md, encoding="utf-8")
+    (event_dir / "EVENT.md").write_bytes(event_md.encode("utf-8"))
 
     if engine:
         try:
             ev = ee.parse_event_md(event_dir)
             engine.events.append(ev)
-            event_log.append({
-                "time":    datetime.now(tz=timezone.utc).strftime("%H:%M:%S UTC"),
-                "event":   name,
-                "action":  "created",
-                "status":  "✅ created",
-                "detail":  f"schedule: {schedule}  |  tool: {mcp_tool}",
-                "to":      "",
-                "subject": "",
-            })
+            engine._events_by_name[ev.name] = ev
+            engine.reschedule(ev)
+            _bump_version()
+            event_log.append(
+                event   = name,
+                action  = "created",
+                status  = "✅ created",
+                detail  = f"schedule: {schedule}  |  tool: {mcp_tool}",
+                to      = "",
+                subject = "",
+            )
             return f"✅ Created event **{name}** — fires {schedule}."
         except Exception as e:
             return f"⚠️  Folder created but engine reload failed: {e}"
 
     return f"✅ Created event folder **{name}** on disk."
 
+# Removes deleted event folders off the request thread.
+_FS_POOL = ThreadPoolExecutor(max_workers=1, thread_name_prefix="fsjanitor")
+
 def delete_event(event_name: str) -> str:
     """Delete an event from disk and remove it from the running engine."""
     if not event_name:
@@ -432,23 +795,29 @@ def delete_event(event_name: str) -> str:
     try:
         # Remove from engine first
         if engine:
-            engine.events = [ev for ev in engine.events if ev.name != event_name]
-            if event_name in engine._last_fired:
-                del engine._last_fired[event_name]
+            ev = engine._events_by_name.pop(event_name, None)
+            if ev is not None:
+                engine.events = [e for e in engine.events if e is not ev]
+                engine.reschedule(ev)
+            engine._last_fired.pop(event_name, None)
+            engine._last_fired_ts.pop(event_name, None)
+            _bump_version()
         
-        # Delete the folder
-        import shutil
-        shutil.rmtree(event_dir)
+        # Rename out of the way (one syscall, frees the name for re-creation),
+        # then delete the tree in the background.  Dot-folders are skipped by
+        # engine.load(), so a leftover from a crash is never loaded.
+        trash_dir = event_dir.with_name(f".{event_name}.deleted-{uuid.uuid4().hex[:8]}")
+        os.rename(event_dir, trash_dir)
+        _FS_POOL.submit(shutil.rmtree, trash_dir, ignore_errors=True)
         
-        event_log.append({
-            "time":    datetime.now(tz=timezone.utc).strftime("%H:%M:%S UTC"),
-            "event":   event_name,
-            "action":  "deleted",
-            "status":  "✅ deleted",
-            "detail":  "Event removed",
-            "to":      "",
-            "subject": "",
-        })
+        event_log.append(
+            event   = event_name,
+            action  = "deleted",
+            status  = "✅ deleted",
+            detail  = "Event removed",
+            to      = "",
+            subject = "",
+        )
         
         return f"✅ Deleted event **{event_name}** — it will no longer fire."
     except Exception as e:
@@ -462,21 +831,22 @@ def activate_event(event_name: str) -> str:
     if not engine:
         return "❌ Engine not running."
     
-    for ev in engine.events:
-        if ev.name == event_name:
-            ev.active = True
-            event_log.append({
-                "time":    datetime.now(tz=timezone.utc).strftime("%H:%M:%S UTC"),
-                "event":   event_name,
-                "action":  "activated",
-                "status":  "🟢 activated",
-                "detail":  f"Will fire on schedule: {ev.schedule_raw}",
-                "to":      "",
-                "subject": "",
-            })
-            return f"🟢 Activated event **{event_name}** — it will now fire {ev.schedule_raw}."
+    ev = engine._events_by_name.get(event_name)
+    if ev is None:
+        return f"❌ Event '{event_name}' not found."
     
-    return f"❌ Event '{event_name}' not found."
+    ev.active = True
+    engine.reschedule(ev)
+    _bump_version()
+    event_log.append(
+        event   = event_name,
+        action  = "activated",
+        status  = "🟢 activated",
+        detail  = f"Will fire on schedule: {ev.schedule_raw}",
+        to      = "",
+        subject = "",
+    )
+    return f"🟢 Activated event **{event_name}** — it will now fire {ev.schedule_raw}."
 
 def deactivate_event(event_name: str) -> str:
     """Deactivate an event so it stops firing on schedule."""
@@ -486,30 +856,31 @@ def deactivate_event(event_name: str) -> str:
     if not engine:
         return "❌ Engine not running."
     
-    for ev in engine.events:
-        if ev.name == event_name:
-            ev.active = False
-            event_log.append({
-                "time":    datetime.now(tz=timezone.utc).strftime("%H:%M:%S UTC"),
-                "event":   event_name,
-                "action":  "deactivated",
-                "status":  "🔴 deactivated",
-                "detail":  "Event stopped",
-                "to":      "",
-                "subject": "",
-            })
-            return f"🔴 Deactivated event **{event_name}** — it will no longer fire automatically."
+    ev = engine._events_by_name.get(event_name)
+    if ev is None:
+        return f"❌ Event '{event_name}' not found."
     
-    return f"❌ Event '{event_name}' not found."
+    ev.active = False
+    engine.reschedule(ev)
+    _bump_version()
+    event_log.append(
+        event   = event_name,
+        action  = "deactivated",
+        status  = "🔴 deactivated",
+        detail  = "Event stopped",
+        to      = "",
+        subject = "",
+    )
+    return f"🔴 Deactivated event **{event_name}** — it will no longer fire automatically."
 
-def execute_action(cmd: dict) -> str:
+async def execute_action(cmd: dict) -> str:
     """Route an <aep_action> command."""
     action = cmd.get("action", "")
 
     if action == "fire":
         # Support both "name" and "event" for backward compatibility
         event_name = cmd.get("name") or cmd.get("event", "")
-        return fire_event_now(event_name)
+        return await fire_event_now(event_name)
     elif action == "create":
         return create_event_on_disk(cmd)
     elif action == "delete":
@@ -529,58 +900,124 @@ def execute_action(cmd: dict) -> str:
 # ══════════════════════════════════════════════════════════════════════════════
 
 app = Flask(__name__)
+app.config['TEMPLATES_AUTO_RELOAD'] = False
+app.jinja_env.auto_reload = False      # no per-request mtime stat of templates
 CORS(app)
 
+def ojsonify(obj):
+    """jsonify() replacement backed by orjson."""
+    return app.response_class(orjson.dumps(obj), mimetype="application/json")
+
+def _request_json() -> dict:
+    """Decode the request body with orjson (400 on malformed JSON)."""
+    try:
+        data = orjson.loads(request.get_data() or b"{}")
+    except orjson.JSONDecodeError:
+        abort(400)
+    return data if isinstance(data, dict) else {}
+
+# Per-process nonce in every ETag: the counters below restart at 0 on each
+# boot, so without it a tab open across a restart could revalidate (304) a
+# body cached from the previous process.
+BOOT_ID = uuid.uuid4().hex[:8]
+
+def _conditional_json(etag: str, build):
+    """
+    Serve build() as JSON tagged with `etag`, or an empty 304 when the
+    client's If-None-Match already carries that tag.  no-cache (not no-store)
+    lets the browser keep the body and revalidate it on every poll.
+    """
+    if request.if_none_match.contains(etag):
+        resp = app.response_class(status=304)
+    else:
+        resp = ojsonify(build())
+    resp.set_etag(etag)
+    resp.headers["Cache-Control"] = "no-cache"
+    return resp
+
+# Compiled once at boot; the route only renders it.
+_INDEX_TEMPLATE = app.jinja_env.get_template('index.html')
+
 @app.route('/')
 def index():
-    return render_template('index.html')
+    return _INDEX_TEMPLATE.render()
 
 @app.route('/api/events')
 def get_events():
     """Get current events."""
     if not engine:
-        return jsonify([])
+        return ojsonify([])
     
-    events = []
-    for ev in engine.events:
-        last = engine._last_fired.get(ev.name)
-        events.append({
-            "name": ev.name,
-            "type": ev.event_type,
-            "schedule": ev.schedule_raw or "—",
-            "action": ev.action.get("mcp") or ev.action.get("script") or "—",
-            "last_fired": last.strftime("%H:%M:%S UTC") if last else "not yet",
-        })
-    return jsonify(events)
+    def build():
+        events = []
+        for ev in engine.events:
+            last = engine._last_fired.get(ev.name)
+            events.append({
+                "name": ev.name,
+                "type": ev.event_type,
+                "schedule": ev.schedule_raw or "—",
+                "action": ev.action_label,
+                "last_fired": last or "not yet",
+            })
+        return events
+    return _conditional_json(f"events-{BOOT_ID}-{engine.version}", build)
 
 @app.route('/api/log')
 def get_log():
-    """Get event log."""
-    return jsonify(event_log)
+    """
+    Get event log entries, optionally only those after ?since=<id>.  The
+    cursor is only meaningful for the process that issued it: a ?boot= other
+    than BOOT_ID (sent back in X-Boot-Id) restarts from the full log.
+    """
+    since = request.args.get('since', default=-1, type=int)
+    if request.args.get('boot') != BOOT_ID:
+        since = -1
+    resp = _conditional_json(f"log-{BOOT_ID}-{event_log.idx}-{since}", lambda: event_log.since(since))
+    resp.headers["X-Boot-Id"] = BOOT_ID
+    return resp
 
 @app.route('/api/fire', methods=['POST'])
 def fire():
-    """Fire an event manually."""
-    data = request.json
+    """Start a manual fire; poll /api/fire/<task_id> for the result."""
+    data = _request_json()
     event_name = data.get('event', '').strip()
     if not event_name:
-        return jsonify({"error": "No event name provided"}), 400
+        return ojsonify({"error": "No event name provided"}), 400
     
-    result = fire_event_now(event_name)
-    return jsonify({"result": result})
+    try:
+        task_id = submit_fire(event_name)
+    except RuntimeError as e:
+        return ojsonify({"error": str(e)}), 429
+    if task_id is None:
+        return ojsonify({"result": "❌ Engine loop not running."})
+    return ojsonify({"task_id": task_id}), 202
+
+@app.route('/api/fire/<task_id>')
+def fire_status(task_id: str):
+    """Result of a manual fire: 202 while pending, then the result (kept FIRE_RESULT_TTL s)."""
+    future = _pending_fires.get(task_id)
+    if future is None:
+        return ojsonify({"error": "Unknown task id"}), 404
+    if not future.done():
+        return ojsonify({"status": "pending"}), 202
+    try:
+        result = future.result(timeout=0)
+    except Exception as e:
+        result = f"❌ Fire failed: {e}"
+    return ojsonify({"status": "done", "result": result})
 
 @app.route('/api/chat', methods=['POST'])
-def chat():
+async def chat():
     """Chat with Claude."""
-    data = request.json
+    data = _request_json()
     user_msg = data.get('message', '').strip()
     history = data.get('history', [])
     
     if not user_msg:
-        return jsonify({"error": "No message provided"}), 400
+        return ojsonify({"error": "No message provided"}), 400
     
     if not OPENAI_API_KEY:
-        return jsonify({"reply": "⚠️  OPENAI_API_KEY not set.  Add it to your .env file."})
+        return ojsonify({"reply": "⚠️  OPENAI_API_KEY not set.  Add it to your .env file."})
     
     # Build messages list
     messages = []
@@ -592,29 +1029,38 @@ def chat():
     messages.append({"role": "user", "content": user_msg})
     
     try:
-        # Add system prompt as first message
+        # Static prompt only — event state comes in through tool calls
         messages_with_system = [
-            {"role": "system", "content": build_system_prompt()}
+            {"role": "system", "content": STATIC_SKILL_PROMPT},
         ] + messages
         
-        response = client.chat.completions.create(
-            model="gpt-4o",
-            max_tokens=1024,
-            messages=messages_with_system,
+        # A cached reply is only valid for the same event state, log position
+        # and completed conversation turns.
+        scope = (
+            engine.version if engine else 0,
+            event_log.idx,
+            hash(tuple((h.get('user'), h['assistant']) for h in history if h.get('assistant'))),
         )
-        reply = response.choices[0].message.content
+        
+        # The async client lives on the engine's persistent loop, so its
+        # connection pool survives across requests (and tools read engine
+        # state from the engine's own thread).
+        reply = await _on_engine_loop(_cached_complete(scope, user_msg, messages_with_system))
     except Exception as e:
         reply = f"❌ API error: {e}"
-        return jsonify({"reply": reply})
+        return ojsonify({"reply": reply})
     
     # Check for action
     cmd = parse_aep_action(reply)
     action_result = None
     if cmd:
-        action_result = execute_action(cmd)
+        action_result = await execute_action(cmd)
     
-    return jsonify({"reply": reply, "action_result": action_result})
+    return ojsonify({"reply": reply, "action_result": action_result})
 
+# Development server below.  For production run a real WSGI server with a
+# single worker (each worker would boot its own event engine) and threads:
+#     gunicorn -w 1 -k gthread --threads 8 -b 0.0.0.0:7860 app:app
 if __name__ == "__main__":
     print("\n🚀 Starting AEP Event Agent on http://localhost:7860")
     print("   Press Ctrl+C to stop\n")
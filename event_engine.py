@@ -21,140 +21,197 @@ real MCP server over stdio or HTTP.
 from __future__ import annotations
 
 import asyncio
+import os
+import heapq
+import importlib.util
+import itertools
 import re
 import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass, field
+from functools import lru_cache
 from datetime import datetime, timezone, timedelta
 from pathlib import Path
-from typing import Any
+from types import MappingProxyType
+from typing import Any, Mapping
 
 import yaml
 
+try:                                    # LibYAML bindings are ~10x faster
+    from yaml import CSafeLoader as _YAMLLoader
+except ImportError:
+    from yaml import SafeLoader as _YAMLLoader
+
 
 # ─── Natural-language schedule → (kind, interval_seconds, cron) ─────────────
 
+_DOW_WORD = r"(?:monday|tuesday|wednesday|thursday|friday|saturday|sunday)"
+
+def _at_time(g: str) -> str:
+    # "<h>[:<mm>] [am|pm]" with group names prefixed by the alternative
+    return rf"\s+at\s+(?P<{g}_h>\d{{1,2}})(?::(?P<{g}_m>\d{{2}}))?\s*(?P<{g}_ap>am|pm)?$"
+
+_RE_SYN_MIDNIGHT = re.compile(r"\bmidnight\b", re.IGNORECASE)
+_RE_SYN_NOON     = re.compile(r"\bnoon\b",     re.IGNORECASE)
+_RE_DOW_WORD     = re.compile(_DOW_WORD, re.IGNORECASE)
+
+# Every supported phrasing in one alternation, tried in the same order the
+# old chain of matches used; the named outer group tells parse() which fired.
+_RE_SCHEDULE = re.compile(
+    r"(?P<interval>every\s+(?P<int_n>\d+)\s+(?P<int_unit>seconds?|minutes?|hours?))"
+    r"|(?P<every_hour>every\s+hour$)"
+    rf"|(?P<dow_at>every\s+(?P<dow_day>{_DOW_WORD}){_at_time('dow')})"
+    rf"|(?P<day_at>every\s+day{_at_time('day')})"
+    rf"|(?P<multi_dow>every\s+(?P<multi_days>{_DOW_WORD}(?:\s*,?\s*(?:and\s+)?{_DOW_WORD})*)"
+    rf"{_at_time('multi')})"
+    rf"|(?P<month_first>(?:on\s+the\s+)?first\s+day\s+of\s+(?:every\s+)?month{_at_time('month')})",
+    re.IGNORECASE,
+)
+_UNIT_SECS = {"second": 1, "minute": 60, "hour": 3600}
+_DOW       = {
+    "sunday": 0, "monday": 1, "tuesday": 2, "wednesday": 3,
+    "thursday": 4, "friday": 5, "saturday": 6,
+}
+
+
+def _to24(h: int, m: int, ampm: str | None) -> tuple[int, int]:
+    if ampm:
+        ampm = ampm.lower()
+        if ampm == "pm" and h != 12: h += 12
+        if ampm == "am" and h == 12: h = 0
+    return h, m
+
+
+@lru_cache(maxsize=256)
+def _parse_schedule(text: str) -> dict[str, Any]:
+    """Memoised worker behind NLSchedule.parse; text is already stripped."""
+    # synonyms
+    text = _RE_SYN_MIDNIGHT.sub("12 AM", text)
+    text = _RE_SYN_NOON.sub("12 PM", text)
+
+    m = _RE_SCHEDULE.match(text)
+    kind = m.lastgroup if m else None
+
+    # ── "every N minutes / hours / seconds" ──
+    if kind == "interval":
+        unit = m["int_unit"].lower().rstrip("s")
+        return {"kind": "interval", "seconds": int(m["int_n"]) * _UNIT_SECS[unit]}
+
+    # ── "every hour" ──
+    if kind == "every_hour":
+        return {"kind": "interval", "seconds": 3600}
+
+    if kind is not None:
+        g     = kind.split("_")[0]
+        h, mn = _to24(int(m[f"{g}_h"]), int(m[f"{g}_m"] or 0), m[f"{g}_ap"])
+
+        # ── "every <dow> at <time>" ──
+        if kind == "dow_at":
+            return {"kind": "cron", "cron": f"{mn} {h} * * {_DOW[m['dow_day'].lower()]}"}
+
+        # ── "every day at <time>" ──
+        if kind == "day_at":
+            return {"kind": "cron", "cron": f"{mn} {h} * * *"}
+
+        # ── "every <dow1> and <dow2> at <time>" ──
+        if kind == "multi_dow":
+            days = _RE_DOW_WORD.findall(m["multi_days"])
+            dows = ",".join(str(_DOW[d.lower()]) for d in days)
+            return {"kind": "cron", "cron": f"{mn} {h} * * {dows}"}
+
+        # ── "first day of every month at <time>" ──
+        if kind == "month_first":
+            return {"kind": "cron", "cron": f"{mn} {h} 1 * *"}
+
+    raise ValueError(f"Cannot parse schedule: '{text}'")
+
+
 class NLSchedule:
     """
     Parse "every 10 minutes", "every hour", "every day at 9 AM", etc.
     Returns a simple dict the engine can act on.
     """
 
-    _DOW = {
-        "sunday": 0, "monday": 1, "tuesday": 2, "wednesday": 3,
-        "thursday": 4, "friday": 5, "saturday": 6,
-    }
-
-    @classmethod
-    def _to24(cls, h: int, m: int, ampm: str | None) -> tuple[int, int]:
-        if ampm:
-            ampm = ampm.lower()
-            if ampm == "pm" and h != 12: h += 12
-            if ampm == "am" and h == 12: h = 0
-        return h, m
-
-    @classmethod
-    def parse(cls, text: str) -> dict[str, Any]:
+    @staticmethod
+    def parse(text: str) -> dict[str, Any]:
         """
         Returns one of:
           {"kind": "interval", "seconds": <int>}
           {"kind": "cron",     "cron": "<5-field>"}
         Raises ValueError if not recognised.
         """
-        text = text.strip()
-        # synonyms
-        text = re.sub(r'\bmidnight\b', '12 AM', text, flags=re.IGNORECASE)
-        text = re.sub(r'\bnoon\b',     '12 PM', text, flags=re.IGNORECASE)
-
-        # ── "every N minutes / hours / seconds" ──
-        m = re.match(r"every\s+(\d+)\s+(seconds?|minutes?|hours?)", text, re.IGNORECASE)
-        if m:
-            n    = int(m.group(1))
-            unit = m.group(2).lower().rstrip("s")
-            secs = n * {"second": 1, "minute": 60, "hour": 3600}[unit]
-            return {"kind": "interval", "seconds": secs}
-
-        # ── "every hour" ──
-        if re.match(r"every\s+hour$", text, re.IGNORECASE):
-            return {"kind": "interval", "seconds": 3600}
-
-        # ── "every <dow> at <time>" ──
-        m = re.match(
-            r"every\s+(monday|tuesday|wednesday|thursday|friday|saturday|sunday)"
-            r"\s+at\s+(\d{1,2})(?::(\d{2}))?\s*(am|pm)?$",
-            text, re.IGNORECASE
-        )
-        if m:
-            dow    = cls._DOW[m.group(1).lower()]
-            h, mn  = cls._to24(int(m.group(2)), int(m.group(3) or 0), m.group(4))
-            return {"kind": "cron", "cron": f"{mn} {h} * * {dow}"}
-
-        # ── "every day at <time>" ──
-        m = re.match(
-            r"every\s+day\s+at\s+(\d{1,2})(?::(\d{2}))?\s*(am|pm)?$",
-            text, re.IGNORECASE
-        )
-        if m:
-            h, mn = cls._to24(int(m.group(1)), int(m.group(2) or 0), m.group(3))
-            return {"kind": "cron", "cron": f"{mn} {h} * * *"}
-
-        # ── "every <dow1> and <dow2> at <time>" ──
-        m = re.match(
-            r"every\s+((?:monday|tuesday|wednesday|thursday|friday|saturday|sunday)"
-            r"(?:\s*,?\s*(?:and\s+)?(?:monday|tuesday|wednesday|thursday|friday|saturday|sunday))*)"
-            r"\s+at\s+(\d{1,2})(?::(\d{2}))?\s*(am|pm)?$",
-            text, re.IGNORECASE
-        )
-        if m:
-            days   = re.findall(r"(monday|tuesday|wednesday|thursday|friday|saturday|sunday)",
-                                m.group(1), re.IGNORECASE)
-            dows   = ",".join(str(cls._DOW[d.lower()]) for d in days)
-            h, mn  = cls._to24(int(m.group(2)), int(m.group(3) or 0), m.group(4))
-            return {"kind": "cron", "cron": f"{mn} {h} * * {dows}"}
+        # a fresh dict per caller, so the memoised one is never mutated
+        return dict(_parse_schedule(text.strip()))
 
-        # ── "first day of every month at <time>" ──
-        m = re.match(
-            r"(?:on\s+the\s+)?first\s+day\s+of\s+(?:every\s+)?month\s+at\s+(\d{1,2})(?::(\d{2}))?\s*(am|pm)?$",
-            text, re.IGNORECASE
-        )
-        if m:
-            h, mn = cls._to24(int(m.group(1)), int(m.group(2) or 0), m.group(3))
-            return {"kind": "cron", "cron": f"{mn} {h} 1 * *"}
 
-        raise ValueError(f"Cannot parse schedule: '{text}'")
+# ─── Cron matcher (lightweight, no deps) ────────────────────────────────────
 
+def _span(a: int, b: int) -> int:
+    """Bitmask with bits a..b (inclusive) set."""
+    return ((1 << (b + 1)) - 1) ^ ((1 << a) - 1)
 
-# ─── Cron matcher (lightweight, no deps) ────────────────────────────────────
 
-def _parse_cron_field(s: str, lo: int, hi: int) -> set[int]:
-    out: set[int] = set()
+def _parse_cron_field(s: str, lo: int, hi: int) -> int:
+    """One cron field → bitmask of the values it allows (bit n = value n)."""
+    out = 0
     for part in s.split(","):
         if "/" in part:
             base, step = part.split("/", 1)
             start = lo if base == "*" else int(base)
-            out.update(range(start, hi + 1, int(step)))
+            for i in range(start, hi + 1, int(step)):
+                out |= 1 << i
         elif "-" in part:
             a, b = part.split("-", 1)
-            out.update(range(int(a), int(b) + 1))
+            out |= _span(int(a), int(b))
         elif part == "*":
-            out.update(range(lo, hi + 1))
+            out |= _span(lo, hi)
         else:
-            out.add(int(part))
+            out |= 1 << int(part)
     return out
 
 
-def _cron_matches(cron: str, dt: datetime) -> bool:
-    fields = cron.strip().split()
-    mins, hrs, doms, months, dows = (
-        _parse_cron_field(fields[0], 0, 59),
-        _parse_cron_field(fields[1], 0, 23),
-        _parse_cron_field(fields[2], 1, 31),
-        _parse_cron_field(fields[3], 1, 12),
-        _parse_cron_field(fields[4], 0, 6),
+_CRON_RANGES = ((0, 59), (0, 23), (1, 31), (1, 12), (0, 6))
+
+
+def _compile_cron(cron: str) -> tuple[int, int, int, int, int]:
+    """Cron string → (minutes, hours, doms, months, dows) bitmasks; bit n = value n."""
+    return tuple(
+        _parse_cron_field(f, lo, hi)
+        for f, (lo, hi) in zip(cron.strip().split(), _CRON_RANGES)
     )
+
+
+def _cron_matches(masks: tuple[int, int, int, int, int], dt: datetime) -> bool:
+    mins, hrs, doms, months, dows = masks
     # Python weekday: Mon=0…Sun=6  →  cron: Sun=0…Sat=6
     cron_dow = (dt.weekday() + 1) % 7
-    return (dt.minute in mins and dt.hour in hrs and dt.day in doms
-            and dt.month in months and cron_dow in dows)
+    return bool((mins >> dt.minute) & (hrs >> dt.hour) & (doms >> dt.day)
+                & (months >> dt.month) & (dows >> cron_dow) & 1)
+
+
+# day-of-month AND day-of-week AND month can line up only once per 28-year
+# weekday/leap cycle (e.g. "0 0 29 2 1"), so search that far before giving up
+_CRON_HORIZON = timedelta(days=28 * 366)
+
+def _next_cron(masks: tuple[int, int, int, int, int], start: datetime) -> datetime | None:
+    """First whole minute >= start matching masks, skipping whole days/hours that can't."""
+    mins, hrs, doms, months, dows = masks
+    t = start.replace(second=0, microsecond=0)
+    if t < start:
+        t += timedelta(minutes=1)
+    limit = t + _CRON_HORIZON
+    while t < limit:
+        if not ((doms >> t.day) & (months >> t.month) & (dows >> (t.weekday() + 1) % 7) & 1):
+            t = (t + timedelta(days=1)).replace(hour=0, minute=0)
+        elif not (hrs >> t.hour) & 1:
+            t = (t + timedelta(hours=1)).replace(minute=0)
+        elif not (mins >> t.minute) & 1:
+            t += timedelta(minutes=1)
+        else:
+            return t
+    return None                              # e.g. "0 0 31 2 *" never matches
 
 
 # ─── MCP client stub ────────────────────────────────────────────────────────
@@ -170,16 +227,17 @@ class MCPClient:
     """
 
     def __init__(self):
-        self._tools: dict[str, Any] = {}   # name → callable
+        self._tools: dict[str, tuple[Any, bool]] = {}   # name → (callable, is_coroutine)
 
     def register_tool(self, name: str, fn: Any) -> None:
-        self._tools[name] = fn
+        self._tools[name] = (fn, asyncio.iscoroutinefunction(fn))
 
     async def call_tool(self, name: str, params: dict[str, Any]) -> dict[str, Any]:
-        fn = self._tools.get(name)
-        if fn is None:
+        entry = self._tools.get(name)
+        if entry is None:
             raise RuntimeError(f"MCP tool '{name}' not found. Available: {list(self._tools.keys())}")
-        if asyncio.iscoroutinefunction(fn):
+        fn, is_coro = entry
+        if is_coro:
             return await fn(params)
         return fn(params)
 
@@ -189,38 +247,43 @@ class MCPClient:
 
 # ─── Event definition (parsed EVENT.md) ─────────────────────────────────────
 
-@dataclass
+@dataclass(slots=True)
 class EventDef:
     name:        str                          # = folder name
     description: str
     event_type:  str                          # "scheduled" | "event-triggered" | "manual"
     schedule_raw:str | None       = None      # raw NL string
-    schedule:    dict | None      = None      # parsed: {kind, seconds} or {kind, cron}
+    schedule:    dict | None      = None      # parsed: {kind, seconds} or {kind, cron, masks}
     action:      dict             = field(default_factory=dict)
+    action_label:str              = "—"       # action.mcp or action.script, for display
     event_dir:   Path             = Path(".")
     active:      bool             = False     # NEW: events are inactive by default
+    last_fired_minute: int        = -1        # epoch minute of the last cron fire
     # resolved params (file refs replaced with content)
     resolved_params: dict         = field(default_factory=dict)
+    # what MCP tools receive: resolved_params + _event_name, built once, read-only
+    mcp_params:  Mapping[str, Any] = field(default_factory=lambda: MappingProxyType({}))
 
 
 # ─── Parser ─────────────────────────────────────────────────────────────────
 
-def _resolve_value(value: Any, event_dir: Path) -> Any:
+def _resolve_value(value: Any, event_dir: str) -> Any:
     """
     If value is a string that looks like a file path inside the event folder,
     read and return its contents.  Otherwise return value unchanged.
+    event_dir is the folder's already-resolved path, as a string.
     """
     if not isinstance(value, str):
         return value
-    # check if it points to a file inside the event folder
-    candidate = (event_dir / value).resolve()
-    if candidate.exists() and str(candidate).startswith(str(event_dir.resolve())):
-        raw = candidate.read_text(encoding="utf-8")
-        # special handling for recipients-style files: strip comments, blank lines
-        if value.endswith(".txt"):
-            lines = [l.strip() for l in raw.splitlines() if l.strip() and not l.strip().startswith("#")]
-            return lines                     # return as list
-        return raw.strip()                   # return as string
+    # check if it points to a file inside the event folder (lexically — one stat)
+    candidate = os.path.normpath(os.path.join(event_dir, value))
+    if candidate.startswith(event_dir + os.sep) and os.path.isfile(candidate):
+        with open(candidate, encoding="utf-8") as f:
+            # special handling for recipients-style files: strip comments, blank
+            # lines — streamed line by line, each line stripped once
+            if value.endswith(".txt"):
+                return [s for l in f if (s := l.strip()) and not s.startswith("#")]   # list
+            return f.read().strip()          # return as string
     return value                             # not a file — return as-is
 
 
@@ -235,11 +298,12 @@ def parse_event_md(event_dir: Path) -> EventDef:
     # split frontmatter
     if not raw_text.startswith("---"):
         raise ValueError(f"[{event_dir.name}] EVENT.md must start with --- frontmatter")
-    parts = raw_text.split("---", maxsplit=2)
-    if len(parts) < 3:
+    # only slice out the frontmatter — the markdown body is never copied
+    end = raw_text.find("\n---", 3)
+    if end == -1:
         raise ValueError(f"[{event_dir.name}] EVENT.md frontmatter not closed with ---")
 
-    data: dict[str, Any] = yaml.safe_load(parts[1]) or {}
+    data: dict[str, Any] = yaml.load(raw_text[3:end], Loader=_YAMLLoader) or {}
 
     # ── required fields ──
     # "type" is always required.
@@ -259,10 +323,13 @@ def parse_event_md(event_dir: Path) -> EventDef:
     schedule     = None
     if schedule_raw and data["type"] == "scheduled":
         schedule = NLSchedule.parse(str(schedule_raw))
+        if schedule["kind"] == "cron":
+            schedule["masks"] = _compile_cron(schedule["cron"])
 
     # ── resolve file references in action.params ──
     raw_params = data.get("action", {}).get("params", {})
-    resolved   = {k: _resolve_value(v, event_dir) for k, v in raw_params.items()}
+    edir       = str(event_dir.resolve())
+    resolved   = {k: _resolve_value(v, edir) for k, v in raw_params.items()}
 
     return EventDef(
         name             = event_dir.name,
@@ -271,14 +338,26 @@ def parse_event_md(event_dir: Path) -> EventDef:
         schedule_raw     = schedule_raw,
         schedule         = schedule,
         action           = data["action"],
+        action_label     = data["action"].get("mcp") or data["action"].get("script") or "—",
         event_dir        = event_dir,
         active           = data.get("active", False),  # NEW: read active flag, default False
         resolved_params  = resolved,
+        mcp_params       = MappingProxyType({**resolved, "_event_name": event_dir.name}),
     )
 
 
 # ─── Event Engine ───────────────────────────────────────────────────────────
 
+def _fmt(v: Any, n: int = 50, keep: bool = True) -> Any:
+    """Truncate str(v) to n chars for logging; short values stay as-is if keep."""
+    s = str(v)
+    if len(s) > n:
+        return s[:n] + "…"
+    return v if keep else s
+
+
+LOAD_WORKERS = 8   # threads used to parse EVENT.md folders in load()
+
 class AEPEventEngine:
     """
     Scans events/, loads EVENT.md definitions, runs the scheduler,
@@ -290,16 +369,28 @@ class AEPEventEngine:
         await engine.run()   # blocks, runs the scheduler loop
     """
 
-    TICK = 1.0   # seconds between scheduler checks
-
     def __init__(self, events_root: Path, mcp: MCPClient | None = None):
         self.events_root = events_root.resolve()
         self.mcp         = mcp or MCPClient()
         self.events:     list[EventDef] = []
+        self._events_by_name: dict[str, EventDef] = {}   # kept in sync with events
         # runtime state per event
-        self._last_fired: dict[str, datetime] = {}
-        self._cron_fired_this_minute: dict[str, bool] = {}
+        self._last_fired:    dict[str, str]      = {}   # "HH:MM:SS UTC", for display
+        self._last_fired_ts: dict[str, float]    = {}   # epoch seconds, for scheduling
+        # next-fire heap of (epoch seconds, seq, event); _scheduled holds each
+        # event's live entry time, so superseded entries are skipped when popped
+        self._queue:     list[tuple[float, int, EventDef]] = []
+        self._scheduled: dict[str, float] = {}
+        self._seq        = itertools.count()
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._wake: asyncio.Event | None = None
+        # script path → (mtime, module); a script is re-imported only when edited
+        self._script_cache: dict[Path, tuple[float, Any]] = {}
         self._running = False
+        # bumped on every change to event state (fires here; activate/create/
+        # delete by callers via bump_version) so readers can cache views of it
+        self.version = 0
+        self._version_lock = threading.Lock()
 
     # ── load ────────────────────────────────────────────────────────────────
 
@@ -308,24 +399,38 @@ class AEPEventEngine:
         if not self.events_root.is_dir():
             raise FileNotFoundError(f"Events root not found: {self.events_root}")
 
-        for candidate in sorted(self.events_root.iterdir()):
-            if not candidate.is_dir():
-                continue
-            if not (candidate / "EVENT.md").exists():
-                continue
+        candidates = [
+            c for c in sorted(self.events_root.iterdir())
+            if c.is_dir() and not c.name.startswith(".") and (c / "EVENT.md").exists()
+        ]
+
+        def _parse(candidate: Path) -> EventDef | Exception:
+            try:
+                return parse_event_md(candidate)
+            except Exception as e:
+                return e
+
+        # parsing is file-I/O bound (EVENT.md + referenced files); overlap it
+        # across events, then register and report in folder order
+        with ThreadPoolExecutor(max_workers=min(LOAD_WORKERS, len(candidates) or 1)) as pool:
+            parsed = list(pool.map(_parse, candidates))
+
+        for candidate, ev in zip(candidates, parsed):
             try:
-                ev = parse_event_md(candidate)
+                if isinstance(ev, Exception):
+                    raise ev
                 self.events.append(ev)
+                self._events_by_name[ev.name] = ev
                 print(f"  📦 Loaded event: {ev.name}")
                 print(f"      type:   {ev.event_type}")
                 if ev.schedule:
-                    print(f"      schedule: {ev.schedule_raw}  →  {ev.schedule}")
-                print(f"      action: {ev.action.get('mcp') or ev.action.get('script')}")
+                    shown = {k: v for k, v in ev.schedule.items() if k != "masks"}
+                    print(f"      schedule: {ev.schedule_raw}  →  {shown}")
+                print(f"      action: {ev.action_label}")
                 if ev.resolved_params:
                     # show resolved params (truncate long values)
                     for k, v in ev.resolved_params.items():
-                        display = str(v)[:60] + ("…" if len(str(v)) > 60 else "")
-                        print(f"        {k}: {display}")
+                        print(f"        {k}: {_fmt(v, 60, keep=False)}")
             except Exception as e:
                 print(f"  ⚠️  Skipping {candidate.name}: {e}")
 
@@ -337,10 +442,9 @@ class AEPEventEngine:
 
         if "mcp" in action:
             tool_name = action["mcp"]
-            params    = ev.resolved_params.copy()  # Copy to avoid modifying original
-            params["_event_name"] = ev.name  # Pass event name to the tool
+            params    = ev.mcp_params      # read-only; includes _event_name
             print(f"\n  🔧 [{ev.name}] Calling MCP tool: {tool_name}")
-            print(f"      params: { {k: (str(v)[:50]+'…' if len(str(v))>50 else v) for k,v in params.items() if k != '_event_name'} }")
+            print(f"      params: { {k: _fmt(v) for k, v in params.items() if k != '_event_name'} }")
             try:
                 result = await self.mcp.call_tool(tool_name, params)
                 print(f"      ✅ Result: {result}")
@@ -350,16 +454,26 @@ class AEPEventEngine:
         elif "script" in action:
             script_path = (ev.event_dir / action["script"]).resolve()
             print(f"\n  📜 [{ev.name}] Running script: {script_path.name}")
-            if not script_path.exists():
+            try:
+                mtime = script_path.stat().st_mtime
+            except OSError:
                 print(f"      ❌ Script not found: {script_path}")
                 return
-            # dynamic import + call handle(params)
-            import importlib.util
-            spec   = importlib.util.spec_from_file_location(f"script_{ev.name}", script_path)
-            module = importlib.util.module_from_spec(spec)
-            spec.loader.exec_module(module)
+            # dynamic import (cached until the file changes) + call handle(params)
+            cached = self._script_cache.get(script_path)
+            if cached is not None and cached[0] == mtime:
+                module = cached[1]
+            else:
+                spec   = importlib.util.spec_from_file_location(f"script_{ev.name}", script_path)
+                module = importlib.util.module_from_spec(spec)
+                spec.loader.exec_module(module)
+                self._script_cache[script_path] = (mtime, module)
             if hasattr(module, "handle"):
-                result = module.handle(ev.resolved_params)
+                if asyncio.iscoroutinefunction(module.handle):
+                    result = await module.handle(ev.resolved_params)
+                else:
+                    # plain handle() may block (subprocess, sockets…) — keep it off the loop
+                    result = await asyncio.to_thread(module.handle, ev.resolved_params)
                 if asyncio.iscoroutine(result):
                     result = await result
                 print(f"      ✅ Script result: {result}")
@@ -371,64 +485,143 @@ class AEPEventEngine:
 
     # ── scheduler ───────────────────────────────────────────────────────────
 
-    def _is_due(self, ev: EventDef, now: datetime) -> bool:
+    def mark_fired(self, ev: EventDef, now: float | None = None) -> None:
+        """Record that ev fired at epoch time now (default: this instant)."""
+        if now is None:
+            now = time.time()
+        self._last_fired_ts[ev.name] = now
+        self._last_fired[ev.name]    = time.strftime("%H:%M:%S UTC", time.gmtime(now))
+        self.bump_version()
+
+    def bump_version(self) -> int:
+        """Mark event state as changed; safe to call from any thread."""
+        with self._version_lock:
+            self.version += 1
+            return self.version
+
+    def _is_due(self, ev: EventDef, now: float) -> bool:
         if ev.event_type != "scheduled" or ev.schedule is None:
             return False
 
         sched = ev.schedule
-        last  = self._last_fired.get(ev.name)
+        last  = self._last_fired_ts.get(ev.name)
 
         if sched["kind"] == "interval":
             if last is None:
                 return True                  # first fire immediately
-            return (now - last).total_seconds() >= sched["seconds"]
+            return now - last >= sched["seconds"]
 
         elif sched["kind"] == "cron":
             # fire once per matching minute
-            minute_key = now.strftime("%Y%m%d%H%M")
-            cache_key  = f"{ev.name}:{minute_key}"
-            if self._cron_fired_this_minute.get(cache_key):
+            minute = int(now) // 60
+            if ev.last_fired_minute == minute:
                 return False
-            if _cron_matches(sched["cron"], now):
-                self._cron_fired_this_minute[cache_key] = True
+            if _cron_matches(sched["masks"], datetime.fromtimestamp(now, tz=timezone.utc)):
+                ev.last_fired_minute = minute
                 return True
 
         return False
 
+    def _next_fire(self, ev: EventDef, now: float) -> float | None:
+        sched = ev.schedule
+        last  = self._last_fired_ts.get(ev.name)
+
+        if sched["kind"] == "interval":
+            if last is None:
+                return now                   # first fire immediately
+            return max(now, last + sched["seconds"])
+
+        if sched["kind"] == "cron":
+            start = now - now % 60
+            if last is not None and last >= start:
+                start += 60                  # already fired this minute
+            t = _next_cron(sched["masks"], datetime.fromtimestamp(start, tz=timezone.utc))
+            return None if t is None else max(now, t.timestamp())
+
+        return None
+
+    def _schedule(self, ev: EventDef, now: float) -> None:
+        """(Re)compute ev's next fire; runs on the engine loop only."""
+        self._scheduled.pop(ev.name, None)
+        if not (ev.active and ev.event_type == "scheduled" and ev.schedule
+                and self._events_by_name.get(ev.name) is ev):
+            return
+        t = self._next_fire(ev, now)
+        if t is None:
+            print(f"  ⚠️  [{ev.name}] Schedule '{ev.schedule_raw}' never matches — not scheduled")
+            return
+        self._scheduled[ev.name] = t
+        heapq.heappush(self._queue, (t, next(self._seq), ev))
+        if self._wake is not None and t <= self._queue[0][0]:
+            self._wake.set()                 # new earliest entry — re-arm the sleep
+
+    def reschedule(self, ev: EventDef) -> None:
+        """
+        Pick up a change to ev (activated, created, deleted…).  Safe to call
+        from any thread; a no-op until run() has started, which schedules
+        every loaded event itself.
+        """
+        if self._loop is None or self._loop.is_closed():
+            return
+        self._loop.call_soon_threadsafe(
+            lambda: self._schedule(ev, time.time()))
+
     async def _tick(self) -> None:
-        now = datetime.now(tz=timezone.utc)
-        for ev in self.events:
-            # NEW: Only fire active events
+        """Fire every event whose heap entry has come due."""
+        now = time.time()
+        while self._queue and self._queue[0][0] <= now:
+            t, _, ev = heapq.heappop(self._queue)
+            if self._scheduled.get(ev.name) != t or self._events_by_name.get(ev.name) is not ev:
+                continue                     # superseded or deleted
+            del self._scheduled[ev.name]
             if ev.active and self._is_due(ev, now):
-                self._last_fired[ev.name] = now
+                self.mark_fired(ev, now)
                 await self._dispatch(ev)
+            self._schedule(ev, time.time())
 
-    # ── run (blocking scheduler loop) ───────────────────────────────────────
+    # ── run (scheduler loop) ────────────────────────────────────────────────
 
     async def run(self, duration_seconds: float | None = None) -> None:
         """
-        Start the scheduler loop.
+        Start the scheduler loop.  It sleeps until the earliest next fire
+        (or until reschedule() brings one forward) instead of polling.
         If duration_seconds is set, stop after that many seconds (for demos).
         Otherwise runs forever until cancelled.
         """
         self._running = True
-        start = datetime.now(tz=timezone.utc)
-        print(f"\n⏳ Event engine running… (tick every {self.TICK}s)")
+        self._loop    = asyncio.get_running_loop()
+        self._wake    = asyncio.Event()
+        start = time.monotonic()
+        print(f"\n⏳ Event engine running…")
         if duration_seconds:
             print(f"   Will stop after {duration_seconds}s")
 
+        now = time.time()
+        for ev in self.events:
+            self._schedule(ev, now)
+
         while self._running:
             await self._tick()
-            await asyncio.sleep(self.TICK)
+            timeout = None
+            if self._queue:
+                timeout = max(0.0, self._queue[0][0] - time.time())
             if duration_seconds:
-                elapsed = (datetime.now(tz=timezone.utc) - start).total_seconds()
-                if elapsed >= duration_seconds:
+                left    = duration_seconds - (time.monotonic() - start)
+                if left <= 0:
                     break
+                timeout = left if timeout is None else min(timeout, left)
+            self._wake.clear()
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
 
         print(f"\n⏹️  Event engine stopped.")
 
     def stop(self) -> None:
         self._running = False
+        if self._loop is not None and self._wake is not None and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._wake.set)
 
     # ── introspection ───────────────────────────────────────────────────────
 
@@ -438,7 +631,7 @@ class AEPEventEngine:
                 "name":        ev.name,
                 "type":        ev.event_type,
                 "schedule":    ev.schedule_raw,
-                "action":      ev.action.get("mcp") or ev.action.get("script"),
+                "action":      ev.action_label,
             }
             for ev in self.events
         ]
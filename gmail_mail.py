@@ -21,8 +21,12 @@ That's it! No OAuth, no device code flow.
 
 from __future__ import annotations
 
+import asyncio
 import os
+import queue
 import smtplib
+import threading
+import time
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from typing import Any
@@ -34,47 +38,197 @@ GMAIL_PASSWORD = os.environ.get("GMAIL_APP_PASSWORD", "").strip()
 SMTP_SERVER = "smtp.gmail.com"
 SMTP_PORT   = 587
 
+# Gmail allows ~15 concurrent SMTP sessions per account; stay well below it.
+SMTP_POOL_SIZE     = int(os.environ.get("SMTP_POOL_SIZE", "3"))
+SMTP_MAX_MESSAGES  = 10_000          # rotate a connection after this many mails
+SMTP_MAX_ATTEMPTS  = 3
+SMTP_RETRY_CODES   = {421, 450, 554}
+
+
+# ══════════════════════════════════════════════════════════════════════════════
+# CONNECTION POOL   – one TLS + AUTH handshake per connection, not per mail
+# ══════════════════════════════════════════════════════════════════════════════
+
+class SMTPPool:
+    """
+    Thread-safe pool of authenticated SMTP connections.
+
+    Connections are opened lazily on first use and then reused across
+    events.  A connection that fails with a transient error is dropped and
+    reopened; one that has sent SMTP_MAX_MESSAGES mails is rotated.
+    """
+
+    def __init__(self, size: int = SMTP_POOL_SIZE):
+        self._idle: queue.Queue[list | None] = queue.Queue(maxsize=size)
+        for _ in range(size):
+            self._idle.put(None)                # empty slot → connect on acquire
+        self._lock = threading.Lock()
+        self._open: list[list] = []
+
+    @staticmethod
+    def _connect() -> smtplib.SMTP:
+        server = smtplib.SMTP(SMTP_SERVER, SMTP_PORT, timeout=30)
+        server.starttls()
+        server.login(GMAIL_USER, GMAIL_PASSWORD)
+        return server
+
+    @staticmethod
+    def _quit(server: smtplib.SMTP) -> None:
+        try:
+            server.quit()
+        except Exception:
+            pass
+
+    def acquire(self) -> list:
+        """Take a connection slot: [server, messages_sent]."""
+        slot = self._idle.get()
+        if slot is not None and slot[1] >= SMTP_MAX_MESSAGES:
+            self._discard(slot)
+            slot = None
+        if slot is None:
+            slot = [self._connect(), 0]
+            with self._lock:
+                self._open.append(slot)
+        return slot
+
+    def release(self, slot: list | None) -> None:
+        """Return a slot to the pool (None = the connection was dropped)."""
+        self._idle.put(slot)
+
+    def _discard(self, slot: list) -> None:
+        with self._lock:
+            if slot in self._open:
+                self._open.remove(slot)
+        self._quit(slot[0])
+
+    def send(self, msg: MIMEMultipart) -> None:
+        """Send one message, reconnecting with exponential backoff on transient errors."""
+        for attempt in range(SMTP_MAX_ATTEMPTS):
+            slot = None
+            try:
+                slot = self.acquire()
+                # all recipients go out in a single MAIL/RCPT/DATA transaction
+                slot[0].send_message(msg)
+                slot[1] += 1
+                self.release(slot)
+                return
+            except (smtplib.SMTPServerDisconnected, smtplib.SMTPResponseException) as e:
+                if slot is not None:
+                    self._discard(slot)
+                self.release(None)
+                code = getattr(e, "smtp_code", None)
+                retriable = isinstance(e, smtplib.SMTPServerDisconnected) or code in SMTP_RETRY_CODES
+                if not retriable or attempt == SMTP_MAX_ATTEMPTS - 1:
+                    raise
+                time.sleep(0.5 * 2 ** attempt)
+            except Exception:
+                if slot is not None:
+                    self._discard(slot)
+                self.release(None)
+                raise
+
+    def send_batch(self, msgs: list[MIMEMultipart]) -> list[Exception | None]:
+        """
+        Send msgs back-to-back over one connection.  Returns one entry per
+        message: None when sent, else the exception (errors are not raised).
+        """
+        errors: list[Exception | None] = []
+        slot = None
+        for msg in msgs:
+            try:
+                if slot is None:
+                    slot = self.acquire()
+                slot[0].send_message(msg)
+                slot[1] += 1
+                errors.append(None)
+            except smtplib.SMTPRecipientsRefused as e:
+                errors.append(e)                # smtplib RSETs; the connection is still good
+            except Exception as e:
+                if slot is not None:
+                    self._discard(slot)
+                self.release(None)
+                slot = None
+                code = getattr(e, "smtp_code", None)
+                if isinstance(e, smtplib.SMTPServerDisconnected) or code in SMTP_RETRY_CODES:
+                    try:
+                        self.send(msg)          # fresh connection + backoff
+                        e = None
+                    except Exception as retry_error:
+                        e = retry_error
+                errors.append(e)
+        if slot is not None:
+            self.release(slot)
+        return errors
+
+    def close(self) -> None:
+        """Quit every open connection."""
+        with self._lock:
+            open_slots, self._open = self._open, []
+        for slot in open_slots:
+            self._quit(slot[0])
+
+
+pool = SMTPPool()
+
 
 # ══════════════════════════════════════════════════════════════════════════════
 # PUBLIC API
 # ══════════════════════════════════════════════════════════════════════════════
 
-async def send_mail(to: list[str], subject: str, body: str) -> dict[str, Any]:
-    """Send email via Gmail SMTP."""
-    
-    if not GMAIL_USER or not GMAIL_PASSWORD:
-        return {
-            "status": "error",
-            "error": "GMAIL_USER or GMAIL_APP_PASSWORD not set in .env"
-        }
-    
-    try:
-        # Create message
-        msg = MIMEMultipart()
-        msg['From'] = GMAIL_USER
-        msg['To'] = ", ".join(to)
-        msg['Subject'] = subject
-        msg.attach(MIMEText(body, 'plain'))
-        
-        # Connect and send
-        with smtplib.SMTP(SMTP_SERVER, SMTP_PORT) as server:
-            server.starttls()
-            server.login(GMAIL_USER, GMAIL_PASSWORD)
-            server.send_message(msg)
-        
+def _build_message(to: list[str], subject: str, body: str) -> MIMEMultipart:
+    msg = MIMEMultipart()
+    msg['From'] = GMAIL_USER
+    msg['To'] = ", ".join(to)
+    msg['Subject'] = subject
+    msg.attach(MIMEText(body, 'plain'))
+    return msg
+
+
+def _result(to: list[str], subject: str, error: Exception | None) -> dict[str, Any]:
+    if error is None:
         print(f"  ✅ Email sent to {', '.join(to)}")
         return {
             "status": "sent",
             "message_id": f"gmail-{subject[:20]}"
         }
-    
-    except smtplib.SMTPAuthenticationError:
+    if isinstance(error, smtplib.SMTPAuthenticationError):
         return {
             "status": "error",
             "error": "Gmail authentication failed. Check GMAIL_USER and GMAIL_APP_PASSWORD in .env"
         }
-    except Exception as e:
-        return {
+    return {
+        "status": "error",
+        "error": f"Failed to send email: {str(error)}"
+    }
+
+
+async def send_mails(messages: list[tuple[list[str], str, str]]) -> list[dict[str, Any]]:
+    """Send several (to, subject, body) emails over a single pooled connection."""
+    
+    if not GMAIL_USER or not GMAIL_PASSWORD:
+        return [{
             "status": "error",
-            "error": f"Failed to send email: {str(e)}"
-        }
+            "error": "GMAIL_USER or GMAIL_APP_PASSWORD not set in .env"
+        } for _ in messages]
+    
+    built:  list[MIMEMultipart]        = []
+    errors: list[Exception | None]    = []
+    for to, subject, body in messages:
+        try:
+            built.append(_build_message(to, subject, body))
+            errors.append(None)
+        except Exception as e:
+            errors.append(e)
+    
+    # send everything that built cleanly, off the event loop (smtplib and the
+    # retry backoff both block); keep results in input order
+    sent = iter(await asyncio.to_thread(pool.send_batch, built))
+    return [
+        _result(to, subject, err if err is not None else next(sent))
+        for (to, subject, _), err in zip(messages, errors)
+    ]
+
+
+async def send_mail(to: list[str], subject: str, body: str) -> dict[str, Any]:
+    """Send email via Gmail SMTP."""
+    return (await send_mails([(to, subject, body)]))[0]
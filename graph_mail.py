@@ -23,11 +23,15 @@ OPTIONAL (only if your organization blocks /organizations/ endpoint):
 
 from __future__ import annotations
 
-import json, os, sys, time, webbrowser
+import asyncio, atexit, os, sys, threading, time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
 from pathlib import Path
 from typing import Any
 
-import requests
+import httpx
+import msal
+import orjson
 
 # ─── config ──────────────────────────────────────────────────────────────────
 USER_EMAIL   = os.environ.get("GRAPH_USER_EMAIL", "").strip()
@@ -39,96 +43,184 @@ PUBLIC_CLIENT_ID = "1b730df6-6f10-4745-9e74-79e99bc38429"   # "Microsoft Graph E
 # Tenant — /organizations/ works for any corporate M365 tenant.
 # If your organization blocks that, set GRAPH_TENANT_ID in .env (see below).
 TENANT_ID        = os.environ.get("GRAPH_TENANT_ID", "").strip() or "organizations"
-DEVICE_CODE_URL  = f"https://login.microsoftonline.com/{TENANT_ID}/oauth2/v2.0/devicecode"
-TOKEN_URL        = f"https://login.microsoftonline.com/{TENANT_ID}/oauth2/v2.0/token"
-GRAPH_SEND_URL   = "https://graph.microsoft.com/v1.0/me/sendMail"
+AUTHORITY        = f"https://login.microsoftonline.com/{TENANT_ID}"
+GRAPH_BATCH_URL  = "https://graph.microsoft.com/v1.0/$batch"
 
-SCOPE            = "Mail.Send offline_access"
+BATCH_MAX          = 20     # Graph's limit of sub-requests per $batch
+BATCH_WINDOW       = 0.05   # seconds send_mail() waits to coalesce concurrent sends
+BATCH_MAX_ATTEMPTS = 3      # retries for sub-requests throttled with 429
+
+SCOPES           = ["Mail.Send"]     # MSAL adds offline_access/openid/profile itself
 TOKEN_CACHE      = Path(__file__).resolve().parent / "token_cache.json"
+CACHE_SAVE_EVERY = 300      # seconds; access-token-only changes are written at most this often
+
+# One pooled client for graph.microsoft.com: TLS sessions and connections
+# are reused across sendMail batches.  (Token traffic goes through MSAL.)
+_http = httpx.AsyncClient(
+    http2   = True,
+    timeout = 10,
+    limits  = httpx.Limits(max_keepalive_connections=8),
+    headers = {"User-Agent": "aep-agent/1.0"},
+)
+
+HTTP_RETRY_STATUS   = {429, 503}
+HTTP_MAX_ATTEMPTS   = 3
+RETRY_AFTER_MAX     = 30.0      # seconds; never sleep longer than this on one Retry-After
+
+
+def _retry_after(value: Any, attempt: int) -> float:
+    """Retry-After (delay-seconds or HTTP-date) → seconds to wait, capped at
+    RETRY_AFTER_MAX; missing or malformed values fall back to backoff."""
+    try:
+        wait = float(value)
+    except (TypeError, ValueError):
+        try:
+            wait = (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds()
+        except (TypeError, ValueError, IndexError):
+            wait = 0.5 * 2 ** attempt
+    return min(max(wait, 0.0), RETRY_AFTER_MAX)
+
+
+async def _post(url: str, **kwargs: Any) -> httpx.Response:
+    """POST on the shared client, retrying 429/503 after Retry-After (or backoff)."""
+    for attempt in range(HTTP_MAX_ATTEMPTS):
+        resp = await _http.post(url, **kwargs)
+        if resp.status_code not in HTTP_RETRY_STATUS or attempt == HTTP_MAX_ATTEMPTS - 1:
+            return resp
+        await asyncio.sleep(_retry_after(resp.headers.get("Retry-After"), attempt))
+    return resp
 
 
 # ══════════════════════════════════════════════════════════════════════════════
-# TOKEN CACHE   – load / save / refresh
+# TOKEN CACHE   – MSAL keeps it in memory; persisted to token_cache.json
 # ══════════════════════════════════════════════════════════════════════════════
 
-class _Tokens:
-    access_token:  str | None = None
-    refresh_token: str | None = None
-    expires_at:    float      = 0
+_cache = msal.SerializableTokenCache()
+if TOKEN_CACHE.exists():
+    try:
+        _cache.deserialize(TOKEN_CACHE.read_text(encoding="utf-8"))
+    except Exception:
+        pass                                 # unreadable cache → log in again
+
 
-    def load(self) -> bool:
-        if not TOKEN_CACHE.exists():
-            return False
-        try:
-            d = json.loads(TOKEN_CACHE.read_text(encoding="utf-8"))
-            self.access_token  = d.get("access_token")
-            self.refresh_token = d.get("refresh_token")
-            self.expires_at    = d.get("expires_at", 0)
-            return True
-        except Exception:
-            return False
-
-    def save(self):
-        TOKEN_CACHE.write_text(json.dumps({
-            "access_token":  self.access_token,
-            "refresh_token": self.refresh_token,
-            "expires_at":    self.expires_at,
-        }), encoding="utf-8")
-
-    def is_valid(self) -> bool:
-        return self.access_token is not None and time.time() < (self.expires_at - 60)
-
-    def apply(self, resp: dict):
-        self.access_token  = resp["access_token"]
-        self.refresh_token = resp.get("refresh_token", self.refresh_token)
-        self.expires_at    = time.time() + resp.get("expires_in", 3600)
-
-    def refresh(self) -> bool:
-        if not self.refresh_token:
-            return False
-        r = requests.post(TOKEN_URL, data={
-            "grant_type":    "refresh_token",
-            "client_id":     PUBLIC_CLIENT_ID,
-            "refresh_token": self.refresh_token,
-            "scope":         SCOPE,
-        })
-        if r.status_code != 200:
-            print(f"  ⚠️  refresh failed: {r.status_code}")
-            return False
-        self.apply(r.json())
-        self.save()
-        print("  ✅ Token refreshed silently.")
-        return True
-
-
-_tokens = _Tokens()
+def _refresh_tokens() -> frozenset[str]:
+    return frozenset(rt.get("secret", "") for rt in
+                     _cache.find(msal.TokenCache.CredentialType.REFRESH_TOKEN))
+
+
+# what token_cache.json currently holds, and when it was written
+_saved_rts  = _refresh_tokens()
+_last_saved = time.monotonic()
+
+_msal_app: msal.PublicClientApplication | None = None
+
+
+def _app() -> msal.PublicClientApplication:
+    # created lazily: construction may contact the authority
+    global _msal_app
+    if _msal_app is None:
+        _msal_app = msal.PublicClientApplication(
+            PUBLIC_CLIENT_ID, authority=AUTHORITY, token_cache=_cache,
+        )
+    return _msal_app
+
+
+def _save_cache(force: bool = False) -> None:
+    """Persist the cache if MSAL changed it — atomically, so a crash mid-write
+    can't leave an empty token_cache.json behind.  A new access token alone
+    is written at most every CACHE_SAVE_EVERY seconds; a rotated refresh
+    token (or force) is written right away."""
+    global _saved_rts, _last_saved
+    if not _cache.has_state_changed:
+        return
+    rts = _refresh_tokens()
+    if not force and rts == _saved_rts and time.monotonic() - _last_saved < CACHE_SAVE_EVERY:
+        return                               # flag stays set → a later save picks it up
+    tmp = TOKEN_CACHE.with_suffix(".json.tmp")
+    try:
+        tmp.write_text(_cache.serialize(), encoding="utf-8")   # serialize() clears the flag
+        os.replace(tmp, TOKEN_CACHE)
+        _saved_rts, _last_saved = rts, time.monotonic()
+    except OSError as e:
+        _cache.has_state_changed = True      # retry on the next save
+        print(f"  ⚠️  Could not save {TOKEN_CACHE.name}: {e}")
+    finally:
+        tmp.unlink(missing_ok=True)
+
+
+atexit.register(_save_cache, True)           # flush anything deferred on clean shutdown
+
+
+def _acquire_silent(force_refresh: bool = False) -> dict | None:
+    """Cached access token, refreshed with the refresh token if needed."""
+    app      = _app()
+    accounts = (USER_EMAIL and app.get_accounts(username=USER_EMAIL)) or app.get_accounts()
+    if not accounts:
+        return None
+    return app.acquire_token_silent(SCOPES, account=accounts[0], force_refresh=force_refresh)
 
 
 # ══════════════════════════════════════════════════════════════════════════════
 # DEVICE CODE FLOW   – the "paste this code" dance (one time)
 # ══════════════════════════════════════════════════════════════════════════════
 
-def _device_code_login() -> bool:
+def _stdin_ready(timeout: float) -> bool:
+    """True once stdin has input, False after timeout (so callers can re-check)."""
+    if os.name == "nt":
+        import msvcrt
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if msvcrt.kbhit():
+                return True
+            time.sleep(0.05)
+        return False
+    import select
+    return bool(select.select([sys.stdin], [], [], timeout)[0])
+
+
+def _enter_presses() -> tuple[asyncio.Event, threading.Event]:
+    """
+    (pressed, stop): `pressed` is set whenever the user hits Enter on an
+    interactive terminal.  A daemon thread watches stdin; it only reads once
+    input is waiting, so after `stop` is set it exits within ~0.2 s instead
+    of sitting in readline and eating the user's next line.
+    """
+    pressed = asyncio.Event()
+    stop    = threading.Event()
+    loop    = asyncio.get_running_loop()
+
+    def _read() -> None:
+        while not stop.is_set():
+            if not _stdin_ready(0.2):
+                continue
+            if not sys.stdin.readline() or stop.is_set() or loop.is_closed():
+                return
+            try:
+                loop.call_soon_threadsafe(pressed.set)
+            except RuntimeError:             # loop closed in between
+                return
+
+    if sys.stdin is not None and sys.stdin.isatty():
+        threading.Thread(target=_read, name="devicecode-enter", daemon=True).start()
+    return pressed, stop
+
+
+async def _device_code_login() -> dict | None:
     """
     1. Ask Microsoft for a device code
     2. Show the user the URL + code
-    3. Poll until the user completes login (or timeout)
+    3. Wait until the user completes login (or timeout)
     """
+    app = _app()
+
     # step 1 — request device code
-    r = requests.post(DEVICE_CODE_URL, data={
-        "client_id": PUBLIC_CLIENT_ID,
-        "scope":     SCOPE,
-    })
-    if r.status_code != 200:
-        print(f"  ❌ Could not get device code: {r.status_code} {r.text[:200]}")
-        return False
+    flow = await asyncio.to_thread(app.initiate_device_flow, scopes=SCOPES)
+    if "user_code" not in flow:
+        print(f"  ❌ Could not get device code: {flow.get('error_description', flow)}")
+        return None
 
-    info = r.json()
-    device_code      = info["device_code"]
-    user_code        = info["user_code"]           # e.g. "ABCD-EFGH"
-    verification_uri = info["verification_uri"]    # https://microsoft.com/devicelogin
-    expires_in       = info.get("expires_in", 300) # usually 5 min
-    interval         = info.get("interval", 5)     # poll every 5s
+    user_code        = flow["user_code"]           # e.g. "ABCD-EFGH"
+    verification_uri = flow["verification_uri"]    # https://microsoft.com/devicelogin
 
     # step 2 — copy code to clipboard + open browser
     try:
@@ -152,73 +244,69 @@ def _device_code_login() -> bool:
         print(f"  │  URL:   {verification_uri:<46} │")
     print(f"  │                                                     │")
     print(f"  │  Then approve the push on your Authenticator app.   │")
+    print(f"  │  (Press Enter once approved to skip the wait.)      │")
     print("  ╰─────────────────────────────────────────────────────╯")
     print()
 
+    import webbrowser                       # only needed on first login
     webbrowser.open(verification_uri)
 
-    # step 3 — poll until done
-    deadline = time.time() + expires_in
-    while time.time() < deadline:
-        time.sleep(interval)
-        r = requests.post(TOKEN_URL, data={
-            "grant_type":  "urn:ietf:params:oauth:grant-type:device_code",
-            "client_id":   PUBLIC_CLIENT_ID,
-            "device_code": device_code,
-        })
-        if r.status_code == 200:
-            _tokens.apply(r.json())
-            _tokens.save()
-            print("  ✅ Logged in! Token saved. You won't be asked again.")
-            return True
-
-        error = r.json().get("error", "")
-        if error == "authorization_pending":
-            print("  ⏳ Waiting for you to log in…", end="\r")
-            continue
-        if error == "slow_down":
-            interval += 5
-            continue
-        # any other error = failed
-        print(f"\n  ❌ Login failed: {r.json().get('error_description', error)}")
-        return False
-
-    print("\n  ❌ Login timed out (5 min). Run again to retry.")
-    return False
+    # step 3 — poll until done: back off 1 s, 2 s, 4 s… up to the server's
+    # interval, and re-check at once when the user presses Enter
+    interval = flow.get("interval", 5)
+    delay    = 1.0
+    deadline = flow.get("expires_at") or time.time() + flow.get("expires_in", 300)
+    pressed, stop = _enter_presses()
+    try:
+        while time.time() < deadline:
+            # exit_condition → MSAL makes a single token request and returns
+            result = await asyncio.to_thread(
+                app.acquire_token_by_device_flow, flow, exit_condition=lambda f: True)
+            if "access_token" in result:
+                print("  ✅ Logged in! Token saved. You won't be asked again.")
+                return result
+
+            error = result.get("error", "")
+            if error == "authorization_pending":
+                print("  ⏳ Waiting for you to log in…", end="\r")
+            elif error == "slow_down":
+                interval += 5
+                delay     = interval
+            else:
+                # any other error = failed
+                print(f"\n  ❌ Login failed: {result.get('error_description', error)}")
+                return None
+
+            pressed.clear()
+            try:
+                await asyncio.wait_for(pressed.wait(), min(delay, interval))
+            except asyncio.TimeoutError:
+                pass
+            delay *= 2
+    finally:
+        stop.set()
+
+    print("\n  ❌ Login timed out. Run again to retry.")
+    return None
 
 
 # ══════════════════════════════════════════════════════════════════════════════
 # PUBLIC API
 # ══════════════════════════════════════════════════════════════════════════════
 
-async def ensure_token() -> str | None:
+async def ensure_token(force_refresh: bool = False) -> str | None:
     """Get a valid access token — from cache, refresh, or device login."""
-    if not _tokens.access_token:
-        _tokens.load()
-
-    if _tokens.is_valid():
-        return _tokens.access_token
-
-    if _tokens.refresh_token and _tokens.refresh():
-        return _tokens.access_token
+    result = await asyncio.to_thread(_acquire_silent, force_refresh)
 
     # nothing cached → device code login
-    if _device_code_login():
-        return _tokens.access_token
-    return None
+    if not result or "access_token" not in result:
+        result = await _device_code_login()
+    _save_cache()
+    return result["access_token"] if result else None
 
 
-async def send_mail(to: list[str], subject: str, body: str) -> dict[str, Any]:
-    """Send email via Graph API."""
-    token = await ensure_token()
-    if not token:
-        return {"status": "error", "error": "Could not obtain access token."}
-
-    headers = {
-        "Authorization": f"Bearer {token}",
-        "Content-Type":  "application/json",
-    }
-    payload = {
+def _payload(to: list[str], subject: str, body: str) -> dict[str, Any]:
+    return {
         "Message": {
             "Subject": subject,
             "Body":    {"ContentType": "Text", "Content": body},
@@ -230,16 +318,109 @@ async def send_mail(to: list[str], subject: str, body: str) -> dict[str, Any]:
         "SaveToSentItems": "true",
     }
 
-    resp = requests.post(GRAPH_SEND_URL, headers=headers, json=payload)
 
-    if resp.status_code == 202:
-        return {"status": "sent", "message_id": f"graph-{resp.headers.get('x-ms-request-id','?')}"}
+async def _post_batch(ids: list[int], messages: list[tuple[list[str], str, str]],
+                      token: str) -> tuple[httpx.Response, str]:
+    """POST one $batch of sendMail sub-requests; 401 → one forced refresh + retry."""
+    batch = {"requests": [
+        {
+            "id":      str(i),
+            "method":  "POST",
+            "url":     "/me/sendMail",
+            "body":    _payload(*messages[i]),
+            "headers": {"Content-Type": "application/json"},
+        }
+        for i in ids
+    ]}
+    body    = orjson.dumps(batch)                 # encoded once, reused on the 401 retry
+    headers = {"Content-Type": "application/json"}
+    resp = await _post(GRAPH_BATCH_URL, content=body,
+                       headers={**headers, "Authorization": f"Bearer {token}"})
+    if resp.status_code == 401:
+        fresh = await asyncio.to_thread(_acquire_silent, True)
+        if fresh and "access_token" in fresh:
+            _save_cache()
+            token = fresh["access_token"]
+            resp  = await _post(GRAPH_BATCH_URL, content=body,
+                                headers={**headers, "Authorization": f"Bearer {token}"})
+    return resp, token
+
+
+async def send_mail_batch(messages: list[tuple[list[str], str, str]]) -> list[dict[str, Any]]:
+    """
+    Send several (to, subject, body) emails through Graph's $batch endpoint,
+    BATCH_MAX per round trip.  Results come back in input order.
+    """
+    token = await ensure_token()
+    if not token:
+        return [{"status": "error", "error": "Could not obtain access token."} for _ in messages]
+
+    results: list[dict[str, Any] | None] = [None] * len(messages)
+    for start in range(0, len(messages), BATCH_MAX):
+        todo = list(range(start, min(start + BATCH_MAX, len(messages))))
+        try:
+            for attempt in range(BATCH_MAX_ATTEMPTS):
+                resp, token = await _post_batch(todo, messages, token)
+                if resp.status_code != 200:
+                    for i in todo:
+                        results[i] = {"status": "error", "error": f"{resp.status_code}: {resp.text[:200]}"}
+                    break
+
+                request_id = resp.headers.get("x-ms-request-id", "?")
+                throttled: list[int] = []
+                wait = 0.0
+                for sub in orjson.loads(resp.content).get("responses", []):
+                    i      = int(sub["id"])
+                    status = sub.get("status")
+                    if status == 202:
+                        results[i] = {"status": "sent", "message_id": f"graph-{request_id}-{i}"}
+                    elif status == 429 and attempt < BATCH_MAX_ATTEMPTS - 1:
+                        throttled.append(i)
+                        wait = max(wait, _retry_after((sub.get("headers") or {}).get("Retry-After"), attempt))
+                    else:
+                        results[i] = {"status": "error", "error": f"{status}: {str(sub.get('body'))[:200]}"}
+                if not throttled:
+                    break
+                # partial failure — resend only the throttled sub-requests
+                todo = throttled
+                await asyncio.sleep(wait)
+        except Exception as e:
+            # keep what Graph already accepted — only the unresolved ones failed
+            for i in todo:
+                if results[i] is None:
+                    results[i] = {"status": "error", "error": f"{type(e).__name__}: {e}"}
+
+    return [r or {"status": "error", "error": "No response in $batch reply."} for r in results]
+
+
+# send_mail() calls arriving within BATCH_WINDOW of each other share one $batch
+_pending: list[tuple[tuple[list[str], str, str], asyncio.Future]] = []
+_flush_task: asyncio.Task | None = None
+
+
+async def _flush_later() -> None:
+    global _pending, _flush_task
+    await asyncio.sleep(BATCH_WINDOW)
+    batch, _pending, _flush_task = _pending, [], None
+    try:
+        results = await send_mail_batch([msg for msg, _ in batch])
+    except Exception as e:
+        results = [{"status": "error", "error": f"{type(e).__name__}: {e}"}] * len(batch)
+    for (_, fut), result in zip(batch, results):
+        if not fut.done():
+            fut.set_result(result)
 
-    # 401 → try one silent refresh + retry
-    if resp.status_code == 401 and _tokens.refresh():
-        headers["Authorization"] = f"Bearer {_tokens.access_token}"
-        resp = requests.post(GRAPH_SEND_URL, headers=headers, json=payload)
-        if resp.status_code == 202:
-            return {"status": "sent", "message_id": f"graph-{resp.headers.get('x-ms-request-id','?')}"}
 
-    return {"status": "error", "error": f"{resp.status_code}: {resp.text[:200]}"}
+async def send_mail(to: list[str], subject: str, body: str) -> dict[str, Any]:
+    """Send email via Graph API (coalesced with concurrent sends into one $batch)."""
+    global _flush_task
+    fut = asyncio.get_running_loop().create_future()
+    _pending.append(((to, subject, body), fut))
+    if _flush_task is None:
+        _flush_task = asyncio.create_task(_flush_later())
+    return await fut
+
+
+async def aclose() -> None:
+    """Close the pooled HTTP client (call once on shutdown)."""
+    await _http.aclose()
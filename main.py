@@ -16,19 +16,19 @@ Run:
 from __future__ import annotations
 
 import asyncio
+import itertools
 import json
 import os
 import re
-import shutil
 import threading
+from collections import deque
 from datetime import datetime, timezone
+from functools import lru_cache
 from pathlib import Path
-from typing import Any
 
 import gradio as gr
-import yaml
 from dotenv import load_dotenv
-from anthropic import Anthropic
+from anthropic import AsyncAnthropic
 
 # ─── env ─────────────────────────────────────────────────────────────────────
 load_dotenv()
@@ -36,7 +36,7 @@ ANTHROPIC_API_KEY = os.environ.get("ANTHROPIC_API_KEY", "")
 if not ANTHROPIC_API_KEY:
     print("⚠️  ANTHROPIC_API_KEY not set.  Copy .env.example → .env and fill it in.")
 
-client = Anthropic(api_key=ANTHROPIC_API_KEY)
+client = AsyncAnthropic(api_key=ANTHROPIC_API_KEY)
 
 # ─── paths ───────────────────────────────────────────────────────────────────
 BASE_DIR    = Path(__file__).resolve().parent
@@ -49,7 +49,11 @@ import event_engine as ee  # NLSchedule, MCPClient, AEPEventEngine, EventDef, pa
 # SHARED STATE   (main thread + engine thread both read/write)
 # ══════════════════════════════════════════════════════════════════════════════
 
-event_log: list[dict] = []          # every firing appends here
+LOG_MAX = 5000
+event_log: deque[dict] = deque(maxlen=LOG_MAX)   # every firing appends here; oldest drop off
+_msg_seq = itertools.count(1)       # mock message ids (the log's length caps at LOG_MAX)
+_log_version = 0                    # bumped on every append, so the UI can skip idle refreshes
+_log_lock = threading.Lock()        # engine thread appends while Gradio workers read
 engine: ee.AEPEventEngine | None = None
 engine_loop: asyncio.AbstractEventLoop | None = None   # the engine's asyncio loop
 
@@ -58,6 +62,14 @@ engine_loop: asyncio.AbstractEventLoop | None = None   # the engine's asyncio lo
 # MOCK MCP MAIL SERVER
 # ══════════════════════════════════════════════════════════════════════════════
 
+@lru_cache(maxsize=64)
+def _parse_recipients(raw: str) -> tuple[str, ...]:
+    """Recipients file text → addresses (# comments and blank lines dropped).
+    Cached: scheduled events resend the same resolved file every time."""
+    return tuple(addr for line in raw.splitlines()
+                 if (addr := line.strip()) and not addr.startswith("#"))
+
+
 async def mock_mail_send(params: dict) -> dict:
     """
     Simulates the mail_send MCP tool.
@@ -70,15 +82,14 @@ async def mock_mail_send(params: dict) -> dict:
     # "to" may arrive as a string (file was .md, resolved as text).
     # Parse it: strip # comments and blank lines → list of addresses.
     if isinstance(raw_to, str):
-        to = [line.strip() for line in raw_to.splitlines()
-              if line.strip() and not line.strip().startswith("#")]
+        to = list(_parse_recipients(raw_to))
     else:
         to = raw_to
 
     await asyncio.sleep(0.3)   # simulate network
 
-    msg_id = f"msg-{len(event_log) + 1:04d}"
-    event_log.append({
+    msg_id = f"msg-{next(_msg_seq):04d}"
+    _log_append({
         "time":    datetime.now(tz=timezone.utc).strftime("%H:%M:%S UTC"),
         "event":   "send-team-mail",
         "action":  "mail_send",
@@ -90,6 +101,13 @@ async def mock_mail_send(params: dict) -> dict:
     return {"status": "sent", "message_id": msg_id}
 
 
+def _log_append(entry: dict) -> None:
+    global _log_version
+    with _log_lock:
+        event_log.append(entry)
+        _log_version += 1
+
+
 # ══════════════════════════════════════════════════════════════════════════════
 # ENGINE BOOT   (runs once at import time, before Gradio starts)
 # ══════════════════════════════════════════════════════════════════════════════
@@ -124,34 +142,55 @@ _boot_engine()
 # CLAUDE AGENT
 # ══════════════════════════════════════════════════════════════════════════════
 
-def _event_state_snapshot() -> str:
-    """Build a text block describing current events — injected into every prompt."""
+# (key, snapshot text, table rows) — rebuilt only when events or fires change
+_events_cache: tuple[tuple, str, list[list[str]]] | None = None
+
+
+def _render_events() -> tuple[str, list[list[str]]]:
+    """One pass over the events → (prompt snapshot, dashboard rows), cached."""
+    global _events_cache
     if not engine:
-        return "No events loaded."
-    lines = []
+        return "No events loaded.", []
+    key = (engine.version, len(engine.events))
+    if _events_cache is not None and _events_cache[0] == key:
+        return _events_cache[1], _events_cache[2]
+
+    lines, rows = [], []
     for ev in engine.events:
-        status = "⏳ scheduled"
-        last   = engine._last_fired.get(ev.name)
-        if last:
-            status = f"last fired {last.strftime('%H:%M:%S UTC')}"
+        last_str = engine._last_fired.get(ev.name)
         lines.append(
             f"  • {ev.name}\n"
             f"      description: {ev.description.strip()}\n"
             f"      type:        {ev.event_type}\n"
             f"      schedule:    {ev.schedule_raw}\n"
-            f"      action:      {ev.action.get('mcp') or ev.action.get('script')}\n"
-            f"      status:      {status}"
+            f"      action:      {ev.action_label}\n"
+            f"      status:      {f'last fired {last_str}' if last_str else '⏳ scheduled'}"
         )
-    return "\n".join(lines) if lines else "No events loaded."
+        rows.append([
+            ev.name,
+            ev.event_type,
+            ev.schedule_raw or "—",
+            ev.action_label,
+            last_str or "not yet",
+        ])
+    snapshot = "\n".join(lines) if lines else "No events loaded."
+    _events_cache = (key, snapshot, rows)
+    return snapshot, rows
+
+
+def _event_state_snapshot() -> str:
+    """Build a text block describing current events — injected into every prompt."""
+    return _render_events()[0]
 
 
 def _recent_log(n: int = 5) -> str:
     """Last N log entries as text for the prompt."""
-    if not event_log:
-        return "  (no events have fired yet)"
-    for entry in event_log[-n:]:
-        yield (f"  [{entry['time']}] {entry['event']} → {entry['status']}  {entry['detail']}")
-    return "\n".join(list(_recent_log(n)))
+    with _log_lock:
+        recent = list(itertools.islice(event_log, max(0, len(event_log) - n), None))
+    return "\n".join(
+        f"  [{entry['time']}] {entry['event']} → {entry['status']}  {entry['detail']}"
+        for entry in recent
+    ) or "  (no events have fired yet)"
 
 
 SYSTEM_PROMPT_TEMPLATE = """\
@@ -196,20 +235,42 @@ scripts/ + references/ that define what happens when it fires.
 • The mock mail MCP tool is called "mail_send".  More tools can be added later.
 """
 
+# Split around the two placeholders once; the {{ }} escapes are undone here
+# since the pieces are concatenated, not passed through str.format.
+_head, _rest = SYSTEM_PROMPT_TEMPLATE.split("{event_state}")
+_mid, _tail  = _rest.split("{recent_log}")
+_PROMPT_HEAD, _PROMPT_MID, _PROMPT_TAIL = (
+    part.replace("{{", "{").replace("}}", "}") for part in (_head, _mid, _tail)
+)
+
+
+# (key, prompt) — key changes whenever a fire, a new event or a log entry lands
+_prompt_cache: tuple[tuple, str] | None = None
+
 
 def build_system_prompt() -> str:
-    log_lines = []
-    for entry in event_log[-5:]:
-        log_lines.append(f"  [{entry['time']}] {entry['event']} → {entry['status']}  {entry['detail']}")
-    return SYSTEM_PROMPT_TEMPLATE.format(
-        event_state = _event_state_snapshot(),
-        recent_log  = "\n".join(log_lines) if log_lines else "  (no events have fired yet)",
-    )
+    global _prompt_cache
+    key = (engine.version if engine else -1,
+           len(engine.events) if engine else 0,
+           _log_version)
+    if _prompt_cache is None or _prompt_cache[0] != key:
+        _prompt_cache = (key, "".join((
+            _PROMPT_HEAD, _event_state_snapshot(),
+            _PROMPT_MID,  _recent_log(5),
+            _PROMPT_TAIL,
+        )))
+    return _prompt_cache[1]
+
+
+_AEP_CLOSE = "</aep_action>"
+_AEP_RE    = re.compile(r"<aep_action>\s*(.*?)\s*</aep_action>", re.DOTALL)
 
 
 def parse_aep_action(text: str) -> dict | None:
     """Extract <aep_action>...</aep_action> JSON from Claude's response."""
-    m = re.search(r"<aep_action>\s*(.*?)\s*</aep_action>", text, re.DOTALL)
+    if "<aep_action>" not in text:          # most replies: skip the regex entirely
+        return None
+    m = _AEP_RE.search(text)
     if not m:
         return None
     try:
@@ -222,19 +283,20 @@ async def _fire_event_async(event_name: str) -> str:
     """Fire a single event right now (runs on the engine's loop)."""
     if not engine:
         return "❌ Engine not running."
-    for ev in engine.events:
-        if ev.name == event_name:
-            await engine._dispatch(ev)
-            engine._last_fired[ev.name] = datetime.now(tz=timezone.utc)
-            return f"✅ Fired **{event_name}** manually."
-    return f"❌ Event '{event_name}' not found.  Available: {[e.name for e in engine.events]}"
+    ev = engine._events_by_name.get(event_name)
+    if ev is None:
+        return f"❌ Event '{event_name}' not found.  Available: {list(engine._events_by_name)}"
+    await engine._dispatch(ev)
+    engine.mark_fired(ev)
+    return f"✅ Fired **{event_name}** manually."
 
 
-def fire_event_now(event_name: str) -> str:
-    """Thread-safe bridge: schedule the async fire on the engine's loop."""
+async def fire_event_now(event_name: str) -> str:
+    """Thread-safe bridge: run the fire on the engine's loop and await it from ours."""
     if engine_loop and engine_loop.is_running():
         future = asyncio.run_coroutine_threadsafe(_fire_event_async(event_name), engine_loop)
-        return future.result(timeout=10)
+        # shield: a timeout stops the wait, not the fire itself
+        return await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(future)), timeout=10)
     return "❌ Engine loop not running."
 
 
@@ -291,7 +353,10 @@ def create_event_on_disk(cmd: dict) -> str:
         try:
             ev = ee.parse_event_md(event_dir)
             engine.events.append(ev)
-            event_log.append({
+            engine._events_by_name[ev.name] = ev
+            engine.reschedule(ev)
+            engine.bump_version()
+            _log_append({
                 "time":    datetime.now(tz=timezone.utc).strftime("%H:%M:%S UTC"),
                 "event":   name,
                 "action":  "created",
@@ -307,12 +372,12 @@ def create_event_on_disk(cmd: dict) -> str:
     return f"✅ Created event folder **{name}** on disk."
 
 
-def execute_action(cmd: dict) -> str:
+async def execute_action(cmd: dict) -> str:
     """Route an <aep_action> command."""
     action = cmd.get("action", "")
 
     if action == "fire":
-        return fire_event_now(cmd.get("event", ""))
+        return await fire_event_now(cmd.get("event", ""))
 
     elif action == "create":
         return create_event_on_disk(cmd)
@@ -328,91 +393,102 @@ def execute_action(cmd: dict) -> str:
 
 def get_events_table() -> list[list[str]]:
     """Current events as rows for the DataFrame."""
-    if not engine:
-        return []
-    rows = []
-    for ev in engine.events:
-        last = engine._last_fired.get(ev.name)
-        rows.append([
-            ev.name,
-            ev.event_type,
-            ev.schedule_raw or "—",
-            ev.action.get("mcp") or ev.action.get("script") or "—",
-            last.strftime("%H:%M:%S UTC") if last else "not yet",
-        ])
-    return rows
+    return _render_events()[1]
 
 
 def get_log_table() -> list[list[str]]:
     """Event log as rows for the DataFrame."""
+    with _log_lock:
+        entries = list(event_log)
     return [
         [e["time"], e["event"], e["action"], e["status"], e["detail"]]
-        for e in event_log
+        for e in entries
     ]
 
 
 # ── chat handler ─────────────────────────────────────────────────────────────
 
-def chat(user_msg: str, history: list[list[str]]) -> tuple[list[list[str]], str]:
+async def chat(user_msg: str, history: list[dict],
+         messages: list[dict]) -> tuple[list[dict], str, list[dict]]:
     """
     Called by Gradio when the user sends a message.
-    Returns (updated history, cleared input).
+    Both lists hold {"role", "content"} dicts and share the turn objects;
+    `history` is what the Chatbot shows (errors included), `messages` the
+    API conversation — it only ever gets valid, alternating turns and is
+    sent as-is, because Gradio adds its own keys to the history dicts.
+    Returns (updated history, cleared input, updated messages).
     """
     if not user_msg.strip():
-        return history, ""
+        return history, "", messages
 
+    user_turn = {"role": "user", "content": user_msg}
     if not ANTHROPIC_API_KEY:
-        history.append([user_msg, "⚠️  ANTHROPIC_API_KEY not set.  Add it to your .env file."])
-        return history, ""
-
-    # build messages list for the API
-    messages = []
-    for h in history:
-        if h[0]:
-            messages.append({"role": "user",      "content": h[0]})
-        if h[1]:
-            messages.append({"role": "assistant", "content": h[1]})
-    messages.append({"role": "user", "content": user_msg})
+        history += [user_turn, {"role": "assistant",
+                                "content": "⚠️  ANTHROPIC_API_KEY not set.  Add it to your .env file."}]
+        return history, "", messages
+
+    messages.append(user_turn)
 
     try:
-        response = client.messages.create(
+        # stream, and stop generating as soon as the action block is complete —
+        # execute_action only needs the <aep_action> command
+        parts: list[str] = []
+        tail = ""
+        async with client.messages.stream(
             model          = "claude-sonnet-4-20250514",
             max_tokens     = 1024,
             system         = build_system_prompt(),
             messages       = messages,
-        )
-        reply = response.content[0].text
+        ) as stream:
+            async for chunk in stream.text_stream:
+                parts.append(chunk)
+                window = tail + chunk            # the tag may straddle two chunks
+                if _AEP_CLOSE in window:
+                    break
+                tail = window[-len(_AEP_CLOSE):]
+        reply = "".join(parts)
     except Exception as e:
-        reply = f"❌ API error: {e}"
-        history.append([user_msg, reply])
-        return history, ""
+        messages.pop()                       # keep user/assistant turns alternating
+        history += [user_turn, {"role": "assistant", "content": f"❌ API error: {e}"}]
+        return history, "", messages
 
     # check for an <aep_action> command in the reply
     cmd = parse_aep_action(reply)
     if cmd:
-        result = execute_action(cmd)
+        result = await execute_action(cmd)
         # append the action result after Claude's reply
         reply = reply + f"\n\n> 🔧 {result}"
 
-    history.append([user_msg, reply])
-    return history, ""
+    assistant_turn = {"role": "assistant", "content": reply}
+    messages.append(assistant_turn)
+    history += [user_turn, assistant_turn]
+    return history, "", messages
 
 
 # ── manual fire handler ──────────────────────────────────────────────────────
 
-def manual_fire(event_name: str) -> str:
+async def manual_fire(event_name: str) -> str:
     if not event_name.strip():
         return "⚠️  Pick an event name from the list."
-    return fire_event_now(event_name.strip())
+    return await fire_event_now(event_name.strip())
 
 
 # ── refresh callbacks ────────────────────────────────────────────────────────
 
-def refresh_events():
-    return gr.update(value=get_events_table())
+# Each browser session remembers the version it last rendered (gr.State);
+# an unchanged version returns a no-op update instead of re-sending the table.
+
+def refresh_events(seen: int):
+    version = engine.version if engine else -1
+    if version == seen:
+        return gr.update(), seen
+    return gr.update(value=get_events_table()), version
 
-def refresh_log():
-    return gr.update(value=get_log_table())
+def refresh_log(seen: int):
+    version = _log_version
+    if version == seen:
+        return gr.update(), seen
+    return gr.update(value=get_log_table()), version
 
 
 # ══════════════════════════════════════════════════════════════════════════════
@@ -441,6 +517,7 @@ with gr.Blocks(theme=theme, title="AEP — Event Agent") as demo:
         with gr.Tab("💬 Chat"):
             chatbot = gr.Chatbot(
                 label="Agent",
+                type="messages",
                 height=480,
                 elem_id="chatbot",
             )
@@ -464,8 +541,11 @@ with gr.Blocks(theme=theme, title="AEP — Event Agent") as demo:
             )
 
             # wire up
-            send_btn.click(chat, inputs=[txt_input, chatbot], outputs=[chatbot, txt_input])
-            txt_input.submit(chat, inputs=[txt_input, chatbot], outputs=[chatbot, txt_input])
+            messages_state = gr.State([])
+            send_btn.click(chat, inputs=[txt_input, chatbot, messages_state],
+                           outputs=[chatbot, txt_input, messages_state])
+            txt_input.submit(chat, inputs=[txt_input, chatbot, messages_state],
+                             outputs=[chatbot, txt_input, messages_state])
 
         # ════════ TAB 2: EVENTS DASHBOARD ════════════════════════════════════
         with gr.Tab("📦 Events"):
@@ -503,9 +583,12 @@ with gr.Blocks(theme=theme, title="AEP — Event Agent") as demo:
 
     # ── periodic refresh for Events + Log tabs ─────────────────────────────
     # Gradio Timer fires a fn periodically; we update both DataFrames.
+    # Only versions that changed since this session's last tick are re-sent.
+    events_seen = gr.State(engine.version if engine else -1)
+    log_seen    = gr.State(_log_version)
     timer = gr.Timer(value=3)
-    timer.tick(refresh_events, outputs=events_df)
-    timer.tick(refresh_log,    outputs=log_df)
+    timer.tick(refresh_events, inputs=events_seen, outputs=[events_df, events_seen])
+    timer.tick(refresh_log,    inputs=log_seen,    outputs=[log_df, log_seen])
 
 
 # ══════════════════════════════════════════════════════════════════════════════